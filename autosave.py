@@ -0,0 +1,57 @@
+import threading
+from contextlib import nullcontext
+
+
+class AutoSaver:
+    # Фонове збереження книги: кожні interval секунд (або одразу після request())
+    # змінені з останнього збереження записи серіалізуються під lock, а пишуться
+    # на диск уже без нього. Потік, що змінює книгу, має тримати той самий lock,
+    # тоді він чекає лише на серіалізацію змін, а не на диск.
+    def __init__(self, book, interval=5.0, lock=None):
+        self.book = book
+        self.interval = interval
+        self.lock = lock if lock is not None else nullcontext()
+        self.error = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="address-book-autosave", daemon=True)
+            self._thread.start()
+        return self
+
+    def request(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # помилка не зупиняє потік: зміни лишаються в _dirty до наступної спроби
+                self.error = e
+
+    def flush(self):
+        if self.book._dirty:
+            self.book.dump(self.lock)
+        self.error = None
+
+    def stop(self):
+        # зупиняє потік і синхронно зберігає решту змін
+        if self._thread is not None:
+            self._stopped.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,51 @@
+import argparse
+import gc
+import random
+import tracemalloc
+
+from main import CompactRecord, Record
+
+# Порівняння пам'яті для Record (PhoneList: словник номер -> Phone) і CompactRecord (array('Q')).
+# Запуск: python -m benchmarks.memory_layout --records 100000 --phones 3
+
+
+def build(record_class, records, phones, seed):
+    rng = random.Random(seed)
+    result = []
+    for i in range(records):
+        record = record_class(f"Contact{i}", f"{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+        for _ in range(phones):
+            record.add_phone(f"{rng.randrange(10 ** 10):010d}")
+        result.append(record)
+    return result
+
+
+def measure(record_class, records, phones, seed):
+    gc.collect()
+    tracemalloc.start()
+    data = build(record_class, records, phones, seed)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprint of Record vs CompactRecord")
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--phones", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{args.records} records x {args.phones} phones")
+    baseline = None
+    for record_class in (Record, CompactRecord):
+        current, peak = measure(record_class, args.records, args.phones, args.seed)
+        baseline = baseline or current
+        print(f"{record_class.__name__:>14}: {current / 2 ** 20:8.1f} MiB "
+              f"({current / args.records:6.0f} B/record, peak {peak / 2 ** 20:.1f} MiB, "
+              f"{current / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+# Навантажувальний клієнт для server.py: concurrency з'єднань, кожне тримає до
+# pipeline запитів у польоті. Звітує запити/с та перцентилі затримки.
+# Запуск: python server.py & python -m benchmarks.server_load --requests 50000
+
+
+def make_request(rng, request_id, write_ratio):
+    if rng.random() < write_ratio:
+        return {"id": request_id, "op": "add", "name": f"Load{rng.randrange(10 ** 6)}",
+                "phones": [f"{rng.randrange(10 ** 10):010d}"]}
+    return {"id": request_id, "op": "find", "term": f"{rng.randrange(1000):03d}", "limit": 10}
+
+
+async def connection(host, port, count, pipeline, write_ratio, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = {}
+    window = asyncio.Semaphore(pipeline)
+    errors = 0
+
+    async def receive():
+        nonlocal errors
+        for _ in range(count):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+            errors += not response["ok"]
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    for request_id in range(count):
+        await window.acquire()
+        sent_at[request_id] = time.perf_counter()
+        writer.write(json.dumps(make_request(rng, request_id, write_ratio)).encode() + b"\n")
+        await writer.drain()
+    await receiver
+    writer.close()
+    return errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args):
+    latencies = []
+    per_connection = args.requests // args.concurrency
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(
+        connection(args.host, args.port, per_connection, args.pipeline, args.write_ratio, args.seed + i, latencies)
+        for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(latencies)} requests in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} req/s, "
+          f"{sum(errors)} errors")
+    print(f"latency p50 {percentile(latencies, 0.50) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=16)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import tempfile
+import time
+
+from benchmarks.memory_layout import build
+from main import AddressBook, Record
+from sharded_book import ShardedAddressBook
+
+# Час пошуку в AddressBook і ShardedAddressBook з різною кількістю шардів.
+# Короткі терміни дають багато збігів (домінує передача результатів між процесами),
+# довгі - мало (домінує пошук, який шарди виконують паралельно).
+# Запуск: python -m benchmarks.sharding --records 500000 --shards 1 2 4 8
+
+
+def run(book, terms, limit):
+    started = time.perf_counter()
+    for term in terms:
+        book.search(term, limit)
+    return (time.perf_counter() - started) / len(terms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency of sharded vs single-process address book")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--term-length", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    records = build(Record, args.records, 2, args.seed)
+    step = 10 ** args.term_length // args.queries or 1
+    terms = [f"{k:0{args.term_length}d}" for k in range(0, 10 ** args.term_length, step)][:args.queries]
+
+    book = AddressBook()
+    book.add_records(records)
+    baseline = run(book, terms, args.limit)
+    print(f"{args.records} records, {len(terms)} queries")
+    print(f"{'single':>10}: {baseline * 1000:8.3f} ms/query")
+    for shards in args.shards:
+        with tempfile.TemporaryDirectory() as directory, ShardedAddressBook(directory, shards) as sharded:
+            sharded.add_records(records)
+            elapsed = run(sharded, terms, args.limit)
+        print(f"{shards:>3} shards: {elapsed * 1000:8.3f} ms/query ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from array import array
+from datetime import date, timedelta
+from pathlib import Path
+
+from main import AddressBook, Birthday, Phone, Record
+
+# Відтворюваний набір бенчмарків AddressBook на синтетичних контактах.
+# Для кожного розміру книги міряє add_record, find, find_by_term, iterator,
+# days_to_birthday, dump і load: пропускну здатність, перцентилі затримки, пам'ять етапу:
+# приріст RSS від початку до кінця етапу або, з --tracemalloc, пік виділеної Python пам'яті.
+# Для iterator/dump/load пропускна здатність - у записах/с, затримка - на сторінку або весь виклик.
+# Генератор детермінований (--seed), результати можна зберегти в JSON і порівняти з попереднім запуском.
+# Запуск:
+#   python -m benchmarks.suite --sizes 10000 1000000 10000000 --json after.json --compare before.json
+
+FIRST = ["Anna", "Bohdan", "Iryna", "Oleh", "Maria", "Taras", "Olena", "Andrii", "Sofia", "Petro",
+         "John", "Jane", "Alex", "Grigi", "Selim", "Daria", "Ivan", "Kateryna", "Mykola", "Yulia"]
+LAST = ["shevchenko", "kovalenko", "bondarenko", "tkachenko", "kravchenko", "melnyk", "boiko",
+        "smith", "brown", "taylor", "ivanov", "moroz", "lysenko", "savchenko", "rudenko"]
+
+
+def generate(count, seed=42, phones=2, birthday_ratio=0.8):
+    # імена унікальні (суфікс - номер), телефони й дні народження - з генератора з seed
+    rng = random.Random(seed)
+    epoch = date(1950, 1, 1)
+    for i in range(count):
+        record = Record(f"{rng.choice(FIRST)}{rng.choice(LAST)}{i}")
+        record.phones = [Phone.trusted(f"{rng.randrange(10 ** 10):010d}") for _ in range(phones)]
+        if rng.random() < birthday_ratio:
+            record.birthday = Birthday((epoch + timedelta(days=rng.randrange(20000))).isoformat())
+        yield record
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def current_rss():
+    # резидентна пам'ять процесу зараз, МіБ, або None, якщо немає /proc (не Linux).
+    # ru_maxrss не підходить: це пік за весь час процесу, він лише зростає від етапу до етапу
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class Stage:
+    # час кожної операції в наносекундах + загальний час і пам'ять етапу
+    def __init__(self, trace):
+        self.trace = trace
+        self.samples = array("q")
+        self.items = None
+        self.extra = {}
+
+    def __enter__(self):
+        gc.collect()
+        self.rss_before = current_rss()
+        if self.trace:
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        self.peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if self.trace else None
+        if self.trace:
+            tracemalloc.stop()
+        self.rss_after = current_rss()
+
+    def timed(self, function, *args):
+        started = time.perf_counter_ns()
+        result = function(*args)
+        self.samples.append(time.perf_counter_ns() - started)
+        return result
+
+    def result(self):
+        samples = sorted(self.samples)
+        items = self.items if self.items is not None else len(samples)
+        result = {"ops": len(samples), "items": items, "seconds": round(self.elapsed, 6),
+                  "items_per_sec": round(items / self.elapsed, 1) if self.elapsed else None,
+                  "p50_us": round(percentile(samples, 0.50) / 1000, 2),
+                  "p90_us": round(percentile(samples, 0.90) / 1000, 2),
+                  "p99_us": round(percentile(samples, 0.99) / 1000, 2),
+                  "max_us": round(samples[-1] / 1000, 2)}
+        if self.rss_after is not None:
+            result["rss_mib"] = round(self.rss_after, 1)
+            result["rss_delta_mib"] = round(self.rss_after - self.rss_before, 1)
+        if self.peak is not None:
+            result["traced_peak_mib"] = round(self.peak, 1)
+        result.update(self.extra)
+        return result
+
+
+def bench_size(size, args, directory):
+    rng = random.Random(args.seed + size)
+    records = list(generate(size, args.seed, args.phones))
+    names = [record.name.value for record in records]
+    queries = min(args.queries, size)
+    results = {}
+
+    book = AddressBook(file=Path(directory) / f"book-{size}.pkl")
+    with Stage(args.tracemalloc) as stage:
+        for record in records:
+            stage.timed(book.add_record, record)
+    results["add_record"] = stage.result()
+    del records
+
+    lookups = [rng.choice(names) if rng.random() < 0.9 else f"Missing{i}" for i in range(queries)]
+    with Stage(args.tracemalloc) as stage:
+        for name in lookups:
+            stage.timed(book.find, name)
+    results["find"] = stage.result()
+
+    # половина термінів - фрагменти телефонів, половина - фрагменти імен
+    terms = [f"{rng.randrange(10 ** 5):05d}" if i % 2 else rng.choice(names)[2:7].lower()
+             for i in range(max(1, queries // 10))]
+    with Stage(args.tracemalloc) as stage:
+        matches = sum(len(stage.timed(book.find_by_term, term)) for term in terms)
+    stage.extra["matches"] = matches
+    results["find_by_term"] = stage.result()
+
+    with Stage(args.tracemalloc) as stage:
+        pages = book.iterator(args.page_size)
+        while stage.timed(next, pages, None) is not None:
+            pass
+    stage.items = size
+    stage.extra["page_size"] = args.page_size
+    results["iterator"] = stage.result()
+
+    sample = [book.data[name] for name in rng.sample(names, queries)]
+    with Stage(args.tracemalloc) as stage:
+        for record in sample:
+            stage.timed(record.days_to_birthday)
+    results["days_to_birthday"] = stage.result()
+    del sample
+
+    with Stage(args.tracemalloc) as stage:
+        stage.timed(book.dump)
+    stage.items = size
+    stage.extra["bytes"] = book.file.stat().st_size
+    results["dump"] = stage.result()
+
+    del book
+    gc.collect()
+    loaded = AddressBook(file=Path(directory) / f"book-{size}.pkl")
+    with Stage(args.tracemalloc) as stage:
+        stage.timed(loaded.load)
+    stage.items = len(loaded)
+    results["load"] = stage.result()
+    os.remove(loaded.file)
+    return results
+
+
+def print_results(size, results, baseline):
+    print(f"\n{size:,} records")
+    print(f"{'operation':>17} {'items/s':>12} {'p50 us':>10} {'p99 us':>10} {'max us':>12} {'mem MiB':>9}  vs baseline")
+    for operation, result in results.items():
+        # пік tracemalloc, якщо його міряли, інакше приріст RSS за етап
+        memory = result.get("traced_peak_mib", result.get("rss_delta_mib"))
+        line = (f"{operation:>17} {result['items_per_sec'] or 0:>12,.0f} {result['p50_us']:>10,.1f} "
+                f"{result['p99_us']:>10,.1f} {result['max_us']:>12,.1f} {memory if memory is not None else '-':>9}")
+        old = baseline.get(str(size), {}).get(operation)
+        if old and old.get("items_per_sec") and result["items_per_sec"]:
+            line += (f"  {result['items_per_sec'] / old['items_per_sec']:5.2f}x items/s, "
+                     f"p99 {result['p99_us'] / old['p99_us'] if old['p99_us'] else 0:5.2f}x")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible AddressBook benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--queries", type=int, default=10_000, help="lookups per read benchmark")
+    parser.add_argument("--phones", type=int, default=2)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="report traced Python peak per operation (slower, distorts timings)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON from a previous run")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "seed": args.seed, "queries": args.queries, "phones": args.phones, "results": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            results = bench_size(size, args, directory)
+            report["results"][str(size)] = results
+            print_results(size, results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
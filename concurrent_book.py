@@ -0,0 +1,158 @@
+import threading
+from contextlib import contextmanager
+
+from main import AddressBook
+
+
+class RWLock:
+    # Блокування читачі-письменник: читачі не блокують одне одного, письменник
+    # працює сам. Письменник, що чекає, не пропускає нових читачів (без голодування).
+    # Обидва режими повторно вхідні в межах потоку; читання всередині запису дозволене.
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def acquire_read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            if self._writer == threading.get_ident():
+                self._local.counted = False
+            else:
+                with self._cond:
+                    while self._writer is not None or self._waiting_writers:
+                        self._cond.wait()
+                    self._readers += 1
+                self._local.counted = True
+        self._local.depth = depth + 1
+
+    def release_read(self):
+        self._local.depth -= 1
+        if self._local.depth == 0 and self._local.counted:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "depth", 0):
+                raise RuntimeError("cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reader(method):
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+def writer(method):
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+class ConcurrentAddressBook(AddressBook):
+    # AddressBook для багатопотокового доступу. Запити читають під спільним
+    # блокуванням, зміни (включно зі змінами записів через Record.add_phone тощо)
+    # - під виключним. Ітерація повертає знімок, тож паралельні add_record/delete
+    # не ламають обхід. dump серіалізує зміни під читанням, а пише файл уже без
+    # блокування, тож фонове збереження не зупиняє ні читачів, ні письменників надовго.
+    def __init__(self, *args, **kwargs):
+        self.lock = RWLock()
+        super().__init__(*args, **kwargs)
+
+    __setitem__ = writer(AddressBook.__setitem__)
+    __delitem__ = writer(AddressBook.__delitem__)
+    add_records = writer(AddressBook.add_records)
+    load = writer(AddressBook.load)
+    defer_indexes = writer(AddressBook.defer_indexes)
+    # пошук з помилками спершу вставляє в BK-дерево нові імена
+    fuzzy_search = writer(AddressBook.fuzzy_search)
+
+    def _reading(self):
+        return self.lock.read()
+
+    def _writing(self):
+        # Record змінює телефони й день народження під цим блокуванням (див. Record._locked),
+        # тож читачі ніколи не обходять record.phones посеред зміни
+        return self.lock.write()
+
+    __len__ = reader(AddressBook.__len__)
+    __contains__ = reader(AddressBook.__contains__)
+    __getitem__ = reader(AddressBook.__getitem__)
+    find = reader(AddressBook.find)
+    find_by_term = reader(AddressBook.find_by_term)
+    search = reader(AddressBook.search)
+    upcoming_birthdays = reader(AddressBook.upcoming_birthdays)
+    phones_with_prefix = reader(AddressBook.phones_with_prefix)
+    born_between = reader(AddressBook.born_between)
+    birthdays_within = reader(AddressBook.birthdays_within)
+    range_by_name = reader(AddressBook.range_by_name)
+    range_by_birthday = reader(AddressBook.range_by_birthday)
+    page = reader(AddressBook.page)
+    find_by_phone = reader(AddressBook.find_by_phone)
+    find_by_phones = reader(AddressBook.find_by_phones)
+    complete_names = reader(AddressBook.complete_names)
+    complete_phones = reader(AddressBook.complete_phones)
+
+    @writer
+    def delete(self, name):
+        super().delete(name)
+
+    @reader
+    def snapshot(self):
+        return list(self.data.values())
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def iterator(self, item_number):
+        records = self.snapshot()
+        for start in range(0, len(records), item_number):
+            yield records[start:start + item_number]
+
+    def dump_in_background(self):
+        thread = threading.Thread(target=self.dump, name="address-book-dump")
+        thread.start()
+        return thread
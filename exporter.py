@@ -0,0 +1,83 @@
+import argparse
+import csv
+import json
+import os
+from pathlib import Path
+
+from importer import detect_format, msgpack
+
+# Потоковий експорт у формати, які читає importer.import_file (CSV, JSON-lines, msgpack).
+# Записи пишуться сторінками з book.iterator(chunk_size), тож пам'ять обмежена розміром
+# сторінки. Файл пишеться поруч і атомарно підміняється після завершення.
+
+
+def record_row(record):
+    return (record.name.value, [phone.value for phone in record.phones],
+            record.birthday.value if record.birthday else None)
+
+
+def write_csv(file, pages):
+    writer = csv.writer(file)
+    writer.writerow(["name", "phones", "birthday"])
+    for page in pages:
+        writer.writerows((name, ";".join(phones), birthday or "") for name, phones, birthday in map(record_row, page))
+
+
+def write_jsonl(file, pages):
+    for page in pages:
+        file.writelines(json.dumps({"name": name, "phones": phones, "birthday": birthday}, ensure_ascii=False) + "\n"
+                        for name, phones, birthday in map(record_row, page))
+
+
+def write_msgpack(file, pages):
+    if msgpack is None:
+        raise ValueError("msgpack format requires the msgpack package")
+    packer = msgpack.Packer()
+    for page in pages:
+        file.write(b"".join(packer.pack(list(record_row(record))) for record in page))
+
+
+# формат -> (запис сторінок, бінарний режим файлу)
+WRITERS = {"csv": (write_csv, False), "jsonl": (write_jsonl, False), "msgpack": (write_msgpack, True)}
+
+
+def export_file(book, path, format=None, chunk_size=1000):
+    path = Path(path)
+    format = format or detect_format(path)
+    if format not in WRITERS:
+        raise ValueError(f"Unknown export format: {format}")
+    writer, binary = WRITERS[format]
+    count = 0
+
+    def pages():
+        nonlocal count
+        for page in book.iterator(chunk_size):
+            count += len(page)
+            yield page
+
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with (open(tmp, "wb") if binary else open(tmp, "w", newline="", encoding="utf-8")) as file:
+            writer(file, pages())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return count
+
+
+if __name__ == "__main__":
+    from main import AddressBook
+    from storage import JournalStorage
+
+    parser = argparse.ArgumentParser(description="Export the address book to CSV, JSON-lines or msgpack")
+    parser.add_argument("file")
+    parser.add_argument("--book", default="adress_book.pkl")
+    parser.add_argument("--format", choices=sorted(WRITERS))
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    book = AddressBook(storage=JournalStorage(args.book))
+    book.load()
+    print(f"exported {export_file(book, args.file, args.format, args.chunk_size)} records")
+    book.close()
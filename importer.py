@@ -0,0 +1,160 @@
+import argparse
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Потоковий імпорт контактів з CSV або JSON-lines. Файл читається пакетами по
+# chunk_size рядків, кожен пакет валідується цілком (record_class.from_rows) і
+# додається через book.add_records. Погані рядки потрапляють у звіт, імпорт триває.
+# Пошукові індекси AddressBook під час імпорту не ведуться - перший запит будує їх разом.
+#
+# CSV: заголовок з колонкою name, необов'язковою birthday та колонками phone*/phones
+# (кілька номерів у комірці розділяються ';').
+# JSON-lines: {"name": "...", "phones": ["..."], "birthday": "YYYY-MM-DD"} у кожному рядку.
+# msgpack (якщо встановлено пакет msgpack): потік масивів [name, [phones], birthday].
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    def __str__(self):
+        return f"ImportReport(imported={self.imported}, errors={len(self.errors)})"
+
+
+def split_phones(value):
+    return [phone.strip() for phone in value.split(";") if phone.strip()]
+
+
+def csv_rows(file, report):
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [column.strip().lower() for column in header]
+    if "name" not in columns:
+        raise ValueError("CSV file must have a 'name' column")
+    name_at = columns.index("name")
+    birthday_at = columns.index("birthday") if "birthday" in columns else None
+    phones_at = [i for i, column in enumerate(columns) if column.startswith("phone")]
+
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(columns):
+            report.errors.append((reader.line_num, f"Expected {len(columns)} columns, got {len(row)}."))
+            continue
+        phones = []
+        for i in phones_at:
+            phones.extend(split_phones(row[i]))
+        birthday = row[birthday_at].strip() if birthday_at is not None else None
+        yield reader.line_num, row[name_at].strip(), phones, birthday
+
+
+def jsonl_rows(file, report):
+    for line_number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            report.errors.append((line_number, f"Invalid JSON: {e.msg}."))
+            continue
+        if not isinstance(item, dict) or not isinstance(item.get("name", ""), str):
+            report.errors.append((line_number, "Expected an object with a string 'name'."))
+            continue
+        phones = item.get("phones", item.get("phone", []))
+        if isinstance(phones, str):
+            phones = split_phones(phones)
+        elif isinstance(phones, list):
+            phones = [str(phone).strip() for phone in phones]
+        else:
+            report.errors.append((line_number, "'phones' must be a list or a string."))
+            continue
+        birthday = item.get("birthday")
+        yield line_number, item.get("name", "").strip(), phones, str(birthday) if birthday else None
+
+
+def msgpack_rows(file, report):
+    if msgpack is None:
+        raise ValueError("msgpack format requires the msgpack package")
+    for number, item in enumerate(msgpack.Unpacker(file, raw=False), 1):
+        if isinstance(item, dict):
+            item = [item.get("name"), item.get("phones", []), item.get("birthday")]
+        if (not isinstance(item, (list, tuple)) or len(item) != 3 or not isinstance(item[0], str)
+                or not isinstance(item[1], (list, tuple))):
+            report.errors.append((number, "Expected [name, [phones], birthday]."))
+            continue
+        name, phones, birthday = item
+        yield number, name.strip(), [str(phone).strip() for phone in phones], str(birthday) if birthday else None
+
+
+# формат -> (читач рядків, бінарний режим файлу)
+READERS = {"csv": (csv_rows, False), "jsonl": (jsonl_rows, False), "msgpack": (msgpack_rows, True)}
+
+
+def detect_format(path):
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if suffix in (".msgpack", ".mpk"):
+        return "msgpack"
+    return "csv"
+
+
+def import_file(book, path, format=None, chunk_size=10_000, record_class=None, capitalize=False):
+    path = Path(path)
+    format = format or detect_format(path)
+    if format not in READERS:
+        raise ValueError(f"Unknown import format: {format}")
+    record_class = record_class or book.record_class
+    report = ImportReport()
+
+    reader, binary = READERS[format]
+    # книга, що вміє відкладати пошукові індекси, будує їх один раз після імпорту
+    defer_indexes = getattr(book, "defer_indexes", None)
+    if defer_indexes is not None:
+        defer_indexes()
+    with (open(path, "rb") if binary else open(path, newline="", encoding="utf-8")) as file:
+        rows = reader(file, report)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            if capitalize:
+                chunk = [(line, name.capitalize(), phones, birthday) for line, name, phones, birthday in chunk]
+            records, errors = record_class.from_rows(chunk)
+            report.errors.extend(errors)
+            report.imported += book.add_records(records)
+
+    report.errors.sort()
+    return report
+
+
+if __name__ == "__main__":
+    from main import AddressBook
+    from storage import JournalStorage
+
+    parser = argparse.ArgumentParser(description="Bulk import contacts into the address book")
+    parser.add_argument("file")
+    parser.add_argument("--book", default="adress_book.pkl")
+    parser.add_argument("--format", choices=sorted(READERS))
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    book = AddressBook(storage=JournalStorage(args.book))
+    book.load()
+    report = import_file(book, args.file, args.format, args.chunk_size)
+    book.dump()
+    book.close()
+    print(report)
+    for line_number, message in report.errors:
+        print(f"line {line_number}: {message}")
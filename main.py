@@ -1,16 +1,54 @@
-from collections import UserDict
-from datetime import datetime
+from array import array
+from bisect import bisect_left, bisect_right, insort
+import calendar
+from collections import Counter, UserDict, defaultdict
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from datetime import date, datetime, timedelta
+import argparse
 import cmd
-import pickle
-from pathlib import Path
+import gc
+import heapq
+import io
+import threading
+from itertools import islice, takewhile
+import os
+import sys
+from time import perf_counter
 from typing import List
 
+from autosave import AutoSaver
+from exporter import export_file
+from importer import import_file
+from metrics import Metrics
+from storage import JournalStorage, PickleStorage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class Field:
+    __slots__ = ("_value",)
+
     def __init__(self, value):
         self._value = None
         self.value = value
 
+    @classmethod
+    def trusted(cls, value):
+        # поле з уже перевіреного значення, без повторної валідації
+        field = cls.__new__(cls)
+        field._value = value
+        return field
+
+    def __getstate__(self):
+        return (self._value,)
+
+    def __setstate__(self, state):
+        # файли, збережені до __slots__, містять словник атрибутів
+        self._value = state.get("_value") if isinstance(state, dict) else state[0]
+
     @property
     def value(self):
         return self._value
@@ -27,75 +65,344 @@ class Field:
 
 
 class Name(Field):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
 
+PHONE_SEPARATORS = str.maketrans("", "", " -()")
+
+
+def normalize_phone(value):
+    # канонічний номер із 10 цифр або None. Приймає "050 456 78 90", "050-456-78-90",
+    # "(050) 4567890" і "+38 050 456 7890"; звичайний 10-значний рядок повертається одразу.
+    # isdigit() пропускає й інші цифри Unicode ("¹²³", "٠١٢"), тому потрібен ще isascii()
+    if not isinstance(value, str):
+        return None
+    if len(value) == 10 and value.isascii() and value.isdigit():
+        return value
+    digits = value.translate(PHONE_SEPARATORS)
+    if digits.startswith("+38"):
+        digits = digits[3:]
+    if len(digits) == 10 and digits.isascii() and digits.isdigit():
+        return digits
+    return None
+
+
 class Phone(Field):
+    # _owner - PhoneList запису, у якому лежить номер: зміна value йде через нього,
+    # щоб список і індекси книги бачили новий номер
+    __slots__ = ("_owner",)
 
     def validate(self):
-        if self._value and not (isinstance(self._value, str) and len(self._value) == 10 and self._value.isdigit()):
+        if self._value and normalize_phone(self._value) != self._value:
             raise ValueError("Phone must be a 10-digit number.")
 
     @Field.value.setter
     def value(self, new_value):
-        if not isinstance(new_value, str) or not new_value.isdigit():
-            raise ValueError("Phone must be a string containing only digits.")
-        self._value = new_value
-        self.validate()
+        owner = getattr(self, "_owner", None)
+        if owner is not None:
+            owner.rename(self._value, new_value)
+            return
+        # перевірка і нормалізація за один прохід, validate() після неї не потрібен
+        phone = normalize_phone(new_value)
+        if phone is None:
+            raise ValueError("Phone must be a 10-digit number.")
+        self._value = phone
+
+    @staticmethod
+    def validate_many(values):
+        # пакетна перевірка без винятків: (нормалізовані номери, маска помилок);
+        # mask[i] == 1, якщо values[i] не номер, - тоді на його місці None
+        phones = list(map(normalize_phone, values))
+        mask = bytearray(phone is None for phone in phones)
+        return phones, mask
+
+
+class PhoneList:
+    # Телефони запису: номер -> Phone у порядку додавання, тож пошук, заміна і видалення
+    # номера коштують O(1), а повторний номер одразу дає ValueError. Назовні поводиться
+    # як список Phone (ітерація, len, індекс, append, pop). Поки номери не змінювали, порядок
+    # тримає сам словник; перша заміна заводить окремий порядок (Phone -> None), щоб
+    # змінений номер лишався на своєму місці, а не переїжджав у кінець.
+    # Зміни списку запису в книзі йдуть під її блокуванням і одразу потрапляють в індекси.
+    __slots__ = ("_by_number", "_order", "_record")
+
+    def __init__(self, phones=(), record=None):
+        # з готового списку (старі файли, імпорт) повтори відкидаються, лишається перший;
+        # Phone з чужого списку копіюється, щоб один об'єкт не належав двом записам
+        self._order = None
+        self._record = record
+        by_number = self._by_number = {}
+        for phone in phones:
+            if phone.__class__ is not Phone or getattr(phone, "_owner", None) is not None:
+                phone = self._adopt(phone)
+            if phone._value not in by_number:
+                by_number[phone._value] = phone
+                phone._owner = self
+
+    def _adopt(self, phone):
+        if not isinstance(phone, Phone):
+            return Phone(phone)
+        return Phone.trusted(phone.value) if self._foreign(phone) else phone
+
+    def _foreign(self, phone):
+        owner = getattr(phone, "_owner", None)
+        return owner is not None and owner is not self and (owner._record is None or owner._record is not self._record)
+
+    def _detach(self, keep):
+        # список замінили новим: його Phone, що не перейшли в keep, більше нічиї
+        for phone in self._by_number.values():
+            if phone._owner is self:
+                phone._owner = keep if phone.value in keep._by_number and keep._by_number[phone.value] is phone else None
+        self._record = None
+
+    @contextmanager
+    def _locked(self):
+        # список, який уже замінили (record.phones = ...), книгу не чіпає
+        record = self._record
+        if record is None:
+            yield None
+            return
+        with record._locked() as book:
+            yield book if self._record is record else None
+
+    def _phones(self):
+        return self._by_number.values() if self._order is None else self._order.keys()
+
+    def __iter__(self):
+        return iter(self._phones())
+
+    def __len__(self):
+        return len(self._by_number)
+
+    def __getitem__(self, index):
+        return list(self._phones())[index]
+
+    def __contains__(self, phone):
+        return (phone.value if isinstance(phone, Phone) else phone) in self._by_number
+
+    def __eq__(self, other):
+        if isinstance(other, (PhoneList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def get(self, number):
+        return self._by_number.get(number)
+
+    def append(self, phone):
+        phone = self._adopt(phone)
+        with self._locked() as book:
+            if phone.value in self._by_number:
+                raise ValueError(f"Phone {phone.value} is already on the list.")
+            self._by_number[phone.value] = phone
+            if self._order is not None:
+                self._order[phone] = None
+            phone._owner = self
+            if book is not None:
+                book._phone_added(self._record, phone.value)
+
+    def pop(self, number):
+        # прибирає номер і повертає його Phone (або None, якщо номера немає)
+        number = number.value if isinstance(number, Phone) else number
+        with self._locked() as book:
+            phone = self._by_number.pop(number, None)
+            if phone is None:
+                return None
+            if self._order is not None:
+                del self._order[phone]
+            phone._owner = None
+            if book is not None:
+                book._phone_removed(self._record, phone.value)
+        return phone
+
+    def rename(self, old, new):
+        # old -> new на тому ж місці; повертає змінений Phone
+        with self._locked() as book:
+            phone = self._by_number.get(old)
+            if phone is None:
+                raise ValueError("not on the list!!")
+            number = normalize_phone(new)
+            if number is None:
+                raise ValueError("Phone must be a 10-digit number.")
+            if number != old:
+                if number in self._by_number:
+                    raise ValueError(f"Phone {number} is already on the list.")
+                if self._order is None:
+                    self._order = dict.fromkeys(self._by_number.values())
+                del self._by_number[old]
+                phone._value = number
+                self._by_number[number] = phone
+            if book is not None:
+                book._phone_edited(self._record, old, number)
+        return phone
+
+
+def parse_date(value):
+    # швидкий шлях для канонічного YYYY-MM-DD, решту перевіряє strptime як і раніше
+    if isinstance(value, str) and len(value) == 10 and value[4] == value[7] == "-":
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, "%Y-%m-%d").date()
 
 
 class Birthday(Field):
+    __slots__ = ("_date",)
 
     @Field.value.setter
     def value(self, new_value):
 
         try:
-            datetime.strptime(new_value, "%Y-%m-%d")
+            parsed = parse_date(new_value)
         except ValueError:
             raise ValueError("Invalid date format!!! Use YYYY-MM-DD.")
 
         self._value = new_value
+        self._date = parsed
+
+    @classmethod
+    def trusted(cls, value):
+        # уже перевірений рядок, але дату все одно треба розібрати - на ній тримаються .date,
+        # days_to_birthday() та індекси днів народження
+        field = super().trusted(value)
+        field._date = parse_date(value)
+        return field
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._date = parse_date(self._value)
+
+    @property
+    def date(self):
+        return self._date
+
+
+# _locked() запису поза книгою: нічого не блокує і повертає book = None
+NOT_IN_BOOK = nullcontext()
 
 
 class Record:
+    __slots__ = ("name", "_phones", "_birthday", "_book", "__weakref__")
+
     def __init__(self, name, birthday=None):
+        self._book = None
         self.name = Name(name)
         self.phones = []
         self.birthday = Birthday(birthday) if birthday else None
 
+    def __getstate__(self):
+        return {"name": self.name, "phones": list(self.phones), "birthday": self.birthday}
+
+    def __setstate__(self, state):
+        self._book = None
+        self.name = state["name"]
+        self.phones = state["phones"]
+        self.birthday = state.get("birthday")
+
+    @property
+    def phones(self):
+        return self._phones
+
+    @phones.setter
+    def phones(self, phones):
+        old = getattr(self, "_phones", None)
+        if phones is old:
+            return
+        phones = PhoneList(phones, self)
+        if self._book is None and (old is None or not old._by_number):
+            # запис поза книгою з порожнім списком (створення, імпорт): нема кого сповіщати
+            self._phones = phones
+            return
+        with self._locked() as book:
+            old = getattr(self, "_phones", None)
+            if book is not None:
+                book._phones_replaced(self, [phone.value for phone in old],
+                                      [phone.value for phone in phones])
+            if old is not None:
+                old._detach(phones)
+            self._phones = phones
+
+    @property
+    def birthday(self):
+        return self._birthday
+
+    @birthday.setter
+    def birthday(self, birthday):
+        if self._book is None:
+            self._birthday = birthday
+            return
+        with self._locked() as book:
+            self._birthday = birthday
+            if book is not None:
+                book._birthday_changed(self)
+
+    def _locked(self):
+        # запис у книзі змінюється під блокуванням книги (ConcurrentAddressBook), щоб читачі
+        # не бачили телефони посеред зміни. Запис поза книгою (створення, імпорт) - без нього
+        if self._book is None:
+            return NOT_IN_BOOK
+        return self._book_locked()
+
+    @contextmanager
+    def _book_locked(self):
+        # якщо запис прибрали з книги, поки чекали, - пробуємо ще раз з його новою книгою
+        # або без блокування
+        while True:
+            book = self._book
+            if book is None:
+                yield None
+                return
+            with book._writing():
+                if self._book is book:
+                    yield book
+                    return
+
+    @classmethod
+    def from_rows(cls, rows):
+        # пакетна валідація для імпорту: rows - [(номер рядка, ім'я, [телефони], день народження)],
+        # повертає (записи, [(номер рядка, помилка)]) і не зупиняється на поганих рядках
+        records, errors = [], []
+        for line_number, name, raw_phones, birthday in rows:
+            if not name:
+                errors.append((line_number, "Name is required."))
+                continue
+            phones, mask = Phone.validate_many(raw_phones)
+            if any(mask):
+                errors.append((line_number, f"Phone must be a 10-digit number: {raw_phones[mask.index(1)]}"))
+                continue
+            try:
+                born = Birthday(birthday) if birthday else None
+            except ValueError as e:
+                errors.append((line_number, str(e)))
+                continue
+            record = cls(name)
+            record.birthday = born
+            record.phones = [Phone.trusted(phone) for phone in phones]
+            records.append(record)
+        return records, errors
+
     def add_phone(self, phone):
-        phone_field = Phone(phone)
-        phone_field.validate()
-        self.phones.append(phone_field)
+        self.phones.append(Phone(phone))
 
     def add_birthday(self, birthday):
         new_birthday = Birthday(birthday)
         self.birthday = new_birthday
 
     def remove_phone(self, phone):
-        self.phones = list(filter(lambda p: p.value != phone, self.phones))
-
-        # self.phones = [p for p in self.phones if p.value != phone]
-
-        # for p in self.phones:
-        #     if p.value == phone:
-        #         self.phones.remove(p)
-        #         break
+        self.phones.pop(normalize_phone(phone))
 
     def edit_phone(self, old_phone, new_phone):
-        for p in self.phones:
-            if p.value == old_phone:
-                p.value = new_phone
-                return
-        raise ValueError("not on the list!!")
+        self.phones.rename(normalize_phone(old_phone), new_phone)
 
     def find_phone(self, phone):
-        for p in self.phones:
-            if p.value == phone:
-                return p
         # return f"{phone} - not on the list!!!"
-        return None
+        return self.phones.get(normalize_phone(phone))
 
     def __str__(self):
         return f"Record(name={self.name.value}, birthday={self.birthday}, phones={[phone.value for phone in self.phones]})"
@@ -108,25 +415,1035 @@ class Record:
             return -1
 
         today = datetime.now().date()
-        next_birthday = datetime.strptime(self.birthday.value, "%Y-%m-%d").date().replace(year=today.year)
-        if today > next_birthday:
-            next_birthday = next_birthday.replace(year=today.year + 1)
-
-        days_until_birthday = (next_birthday - today).days
+        days_until_birthday = (next_birthday(self.birthday.date, today) - today).days
         return days_until_birthday
 
 
+def leap_day_of_year(month, day):
+    # день року у високосному календарі, щоб 29 лютого мало власний номер
+    return date(2000, month, day).timetuple().tm_yday
+
+
+def birthday_in_year(born, year):
+    # 29 лютого в невисокосний рік святкують 1 березня
+    if born.month == 2 and born.day == 29 and not calendar.isleap(year):
+        return date(year, 3, 1)
+    return born.replace(year=year)
+
+
+def next_birthday(born, today):
+    upcoming = birthday_in_year(born, today.year)
+    if today > upcoming:
+        upcoming = birthday_in_year(born, today.year + 1)
+    return upcoming
+
+
+def birthday_window(today, days):
+    # (місяць, день) -> через скільки днів настане це свято, для днів [today, today + days]
+    window = {}
+    for offset in range(min(days, 365) + 1):
+        current = today + timedelta(days=offset)
+        window.setdefault((current.month, current.day), offset)
+        if current.month == 3 and current.day == 1 and not calendar.isleap(current.year):
+            window.setdefault((2, 29), offset)
+    return window
+
+
+MATCH_EXACT, MATCH_PREFIX, MATCH_SUBSTRING = range(3)
+
+
+@contextmanager
+def gc_paused():
+    # індекси створюють мільйони дрібних контейнерів, на яких циклічний GC
+    # запускається знову й знову, не знаходячи сміття
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def match_rank(text, term):
+    if text == term:
+        return MATCH_EXACT
+    if text.startswith(term):
+        return MATCH_PREFIX
+    if term in text:
+        return MATCH_SUBSTRING
+    return None
+
+
+class CompactRecord(Record):
+    # Телефони зберігаються як 10-значні числа в array('Q') замість списку Phone.
+    # record.phones повертає нові об'єкти Phone - змінювати номери слід через методи запису.
+    # Масив лежить у слоті _phones базового класу.
+    __slots__ = ()
+
+    @staticmethod
+    def _number(phone):
+        phone = normalize_phone(phone)
+        return int(phone) if phone is not None else None
+
+    @property
+    def phones(self):
+        return [Phone(f"{number:010d}") for number in self._phones]
+
+    @phones.setter
+    def phones(self, phones):
+        if isinstance(phones, array):
+            numbers = array("Q", dict.fromkeys(phones))
+        else:
+            numbers = array("Q", dict.fromkeys(int(Phone(str(phone)).value) for phone in phones))
+        with self._locked() as book:
+            if book is not None:
+                book._phones_replaced(self, [f"{number:010d}" for number in self._phones],
+                                      [f"{number:010d}" for number in numbers])
+            self._phones = numbers
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["phones"] = self._phones
+        return state
+
+    def add_phone(self, phone):
+        phone_field = Phone(phone)
+        number = int(phone_field.value)
+        with self._locked() as book:
+            if number in self._phones:
+                raise ValueError(f"Phone {phone_field.value} is already on the list.")
+            self._phones.append(number)
+            if book is not None:
+                book._phone_added(self, phone_field.value)
+
+    def remove_phone(self, phone):
+        number = self._number(phone)
+        with self._locked() as book:
+            if number is None or number not in self._phones:
+                return
+            self._phones.remove(number)
+            if book is not None:
+                book._phone_removed(self, f"{number:010d}")
+
+    def edit_phone(self, old_phone, new_phone):
+        number = self._number(old_phone)
+        with self._locked() as book:
+            if number is None or number not in self._phones:
+                raise ValueError("not on the list!!")
+            phone_field = Phone(new_phone)
+            new_number = int(phone_field.value)
+            if new_number != number and new_number in self._phones:
+                raise ValueError(f"Phone {phone_field.value} is already on the list.")
+            self._phones[self._phones.index(number)] = new_number
+            if book is not None:
+                book._phone_edited(self, f"{number:010d}", phone_field.value)
+
+    def find_phone(self, phone):
+        number = self._number(phone)
+        if number is not None and number in self._phones:
+            return Phone.trusted(f"{number:010d}")
+        return None
+
+
+def record_rank(record, term, lowered):
+    best = match_rank(record.name.value.lower(), lowered)
+    for phone in record.phones:
+        if best == MATCH_EXACT:
+            break
+        rank = match_rank(phone.value, term)
+        if rank is not None and (best is None or rank < best):
+            best = rank
+    return best
+
+
+def rank_records(records, term, limit=None):
+    # унікальні збіги у порядку: точні, префіксні, підрядкові
+    if limit is not None and limit <= 0:
+        return []
+    lowered = term.lower()
+    buckets = ([], [], [])
+    for record in records:
+        rank = record_rank(record, term, lowered)
+        if rank is None:
+            continue
+        buckets[rank].append(record)
+        # точні збіги вже заповнили всі N місць - кращих результатів не буде
+        if limit is not None and len(buckets[MATCH_EXACT]) >= limit:
+            break
+    result = [record for bucket in buckets for record in bucket]
+    return result if limit is None else result[:limit]
+
+
+class NgramIndex:
+    # n-gram -> {key: кількість значень запису, що містять цю n-граму}
+    def __init__(self, n=3):
+        self.n = n
+        self._postings = defaultdict(Counter)
+
+    def grams(self, text):
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, key, text):
+        for gram in self.grams(text):
+            self._postings[gram][key] += 1
+
+    def add_many(self, items):
+        # спершу групуємо ключі за n-грамами, потім оновлюємо кожен список входжень одним update
+        batch = defaultdict(list)
+        n = self.n
+        for key, text in items:
+            for gram in {text[i:i + n] for i in range(len(text) - n + 1)}:
+                batch[gram].append(key)
+        for gram, keys in batch.items():
+            self._postings[gram].update(keys)
+
+    def remove(self, key, text):
+        for gram in self.grams(text):
+            keys = self._postings.get(gram)
+            if keys is None:
+                continue
+            keys[key] -= 1
+            if keys[key] <= 0:
+                del keys[key]
+            if not keys:
+                del self._postings[gram]
+
+    def clear(self):
+        self._postings.clear()
+
+    def candidates(self, term):
+        # None означає, що термін закороткий для індексу і потрібен повний перегляд
+        if len(term) < self.n:
+            return None
+        result = None
+        for gram in sorted(self.grams(term), key=lambda g: len(self._postings.get(g, ()))):
+            keys = self._postings.get(gram)
+            if not keys:
+                return set()
+            result = set(keys) if result is None else result.intersection(keys)
+            if not result:
+                break
+        return result
+
+
+class PhoneIndex:
+    # точний номер -> ключ запису; номер, що є в кількох записах, тримає список ключів,
+    # власник - перший. Запис не містить номер двічі (PhoneList, CompactRecord), тож
+    # лічильники не потрібні. add і remove повертають True, коли номер з'являється
+    # в книзі вперше або зникає з неї
+    def __init__(self):
+        self._owners = {}
+
+    def add(self, key, phone):
+        owners = self._owners.get(phone)
+        if owners is None:
+            self._owners[phone] = key
+            return True
+        if isinstance(owners, list):
+            if key not in owners:
+                owners.append(key)
+        elif owners != key:
+            self._owners[phone] = [owners, key]
+        return False
+
+    def remove(self, key, phone):
+        owners = self._owners.get(phone)
+        if owners is None:
+            return False
+        if isinstance(owners, list):
+            if key in owners:
+                owners.remove(key)
+                if len(owners) == 1:
+                    self._owners[phone] = owners[0]
+            return False
+        if owners != key:
+            return False
+        del self._owners[phone]
+        return True
+
+    def clear(self):
+        self._owners.clear()
+
+    def owner(self, phone):
+        owners = self._owners.get(phone)
+        return owners[0] if isinstance(owners, list) else owners
+
+    def keys(self, phone):
+        # усі записи з цим номером, власник першим
+        owners = self._owners.get(phone)
+        if owners is None:
+            return []
+        return list(owners) if isinstance(owners, list) else [owners]
+
+    def owners(self, phones):
+        get = self._owners.get
+        return [owners[0] if isinstance(owners := get(phone), list) else owners for phone in phones]
+
+
+def distance_from(term):
+    # відстань Левенштейна від term до будь-якого слова: бітово-паралельний алгоритм
+    # Маєрса, O(len(слова)) операцій з цілими замість таблиці len(term) x len(слова)
+    m = len(term)
+    if not m:
+        return len
+    peq = {}
+    for i, ch in enumerate(term):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+
+    def distance(word):
+        pv, mv, score = full, 0, m
+        for ch in word:
+            eq = peq.get(ch, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = (mv | ~(xh | pv)) & full
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = (ph << 1) | 1
+            mh <<= 1
+            pv = (mh | ~(xv | ph)) & full
+            mv = ph & xv & full
+        return score
+
+    return distance
+
+
+def levenshtein(a, b):
+    return distance_from(a)(b)
+
+
+class BKTree:
+    # BK-дерево над іменами (нижній регістр) для пошуку з помилками.
+    # Вузол - [слово, {відстань: дочірній вузол}]. Видалене слово лишається в дереві
+    # без ключів, а коли таких більше, ніж живих, дерево перебудовується.
+    # Нові слова чекають у _pending і вставляються порціями до FLUSH_LIMIT за пошук, тож ні
+    # завантаження книги, ні перший пошук не платять за все дерево одразу. Ще не вставлені
+    # слова пошук перевіряє перебором (pending=True) або пропускає (pending=False).
+    FLUSH_LIMIT = 1000
+
+    def __init__(self):
+        self._root = None
+        self._keys = {}
+        self._pending = []
+        self._dead = 0
+
+    def add(self, key, text):
+        keys = self._keys.get(text)
+        if keys is None:
+            self._keys[text] = {key: None}
+            self._pending.append(text)
+            return
+        if not keys:
+            self._dead -= 1
+        keys[key] = None
+
+    def remove(self, key, text):
+        keys = self._keys.get(text)
+        if keys and key in keys:
+            del keys[key]
+            if not keys:
+                self._dead += 1
+
+    def clear(self):
+        self.__init__()
+
+    def _insert(self, word):
+        if self._root is None:
+            self._root = [word, {}]
+            return
+        node = self._root
+        distance = distance_from(word)
+        while True:
+            d = distance(node[0])
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [word, {}]
+                return
+            node = child
+
+    def _flush(self, limit=None):
+        if self._dead > max(1000, len(self._keys) - self._dead):
+            self._keys = {word: keys for word, keys in self._keys.items() if keys}
+            self._root, self._pending, self._dead = None, list(self._keys), 0
+        if limit is None or len(self._pending) <= limit:
+            pending, self._pending = self._pending, []
+        else:
+            pending = self._pending[-limit:]
+            del self._pending[-limit:]
+        for word in pending:
+            if self._keys[word]:
+                self._insert(word)
+            else:
+                del self._keys[word]
+                self._dead -= 1
+
+    def search(self, term, k, pending=True):
+        # [(відстань, ключ)] для всіх слів на відстані <= k від term
+        self._flush(self.FLUSH_LIMIT)
+        distance = distance_from(term)
+        found = []
+        if pending:
+            for word in self._pending:
+                keys = self._keys[word]
+                # відстань не менша за різницю довжин - рахуємо її лише для близьких за довжиною
+                if keys and abs(len(word) - len(term)) <= k:
+                    d = distance(word)
+                    if d <= k:
+                        found.extend((d, key) for key in keys)
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            word, children = stack.pop()
+            d = distance(word)
+            if d <= k:
+                found.extend((d, key) for key in self._keys[word])
+            # нерівність трикутника: шукане може бути лише у гілках d-k..d+k
+            for edge, child in children.items():
+                if d - k <= edge <= d + k:
+                    stack.append(child)
+        return found
+
+
+class SortedIndex:
+    # відсортований список, розбитий на блоки до 2 * LOAD значень: пошук - bisect по
+    # максимумах блоків, вставка й видалення зсувають лише один блок.
+    # key - як у sorted: значення впорядковуються за key(значення), межі irange задаються
+    # в тих самих термінах; у блоках лежать самі значення, ключі блоків - лише в _maxes
+    LOAD = 1000
+
+    def __init__(self, key=None):
+        self._key = key
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value):
+        self._len += 1
+        k = value if self._key is None else self._key(value)
+        if not self._maxes:
+            self._lists.append([value])
+            self._maxes.append(k)
+            return
+        i = bisect_left(self._maxes, k)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(value)
+            self._maxes[i] = k
+        else:
+            insort(self._lists[i], value, key=self._key)
+        block = self._lists[i]
+        if len(block) > 2 * self.LOAD:
+            self._lists.insert(i + 1, block[self.LOAD:])
+            del block[self.LOAD:]
+            self._maxes.insert(i, block[-1] if self._key is None else self._key(block[-1]))
+
+    def clear(self):
+        self._lists, self._maxes, self._len = [], [], 0
+
+    def update(self, values):
+        # великий пакет дешевше злити з усім списком і розбити на блоки заново
+        values = list(values)
+        if len(values) * 8 < self._len:
+            for value in values:
+                self.add(value)
+            return
+        merged = [value for block in self._lists for value in block]
+        merged.extend(values)
+        merged.sort(key=self._key)
+        key = self._key or (lambda value: value)
+        self._lists = [merged[i:i + self.LOAD] for i in range(0, len(merged), self.LOAD)]
+        self._maxes = [key(block[-1]) for block in self._lists]
+        self._len = len(merged)
+
+    def remove(self, value):
+        key = self._key or (lambda value: value)
+        k = key(value)
+        i = bisect_left(self._maxes, k)
+        # значення з однаковим ключем можуть займати кілька сусідніх блоків
+        while i < len(self._maxes):
+            block = self._lists[i]
+            j = bisect_left(block, k, key=self._key)
+            while j < len(block) and key(block[j]) == k:
+                if block[j] == value:
+                    del block[j]
+                    self._len -= 1
+                    if block:
+                        self._maxes[i] = key(block[-1])
+                    else:
+                        del self._lists[i]
+                        del self._maxes[i]
+                    return
+                j += 1
+            if j < len(block):
+                return
+            i += 1
+
+    def irange(self, low=None, high=None, inclusive=(True, True)):
+        # значення з ключами від low до high; None - без межі
+        key = self._key
+        if low is None:
+            i = j = 0
+        else:
+            find = bisect_left if inclusive[0] else bisect_right
+            i = find(self._maxes, low)
+            if i == len(self._maxes):
+                return
+            j = find(self._lists[i], low, key=key)
+        for block in islice(self._lists, i, None):
+            for value in islice(block, j, None):
+                if high is not None:
+                    k = value if key is None else key(value)
+                    if k > high or (k == high and not inclusive[1]):
+                        return
+                yield value
+            j = 0
+
+    def prefixed(self, prefix, limit=None):
+        # до limit значень, чий ключ починається з prefix, у порядку ключів; O(log n + limit)
+        key = self._key or (lambda value: value)
+        return list(islice(takewhile(lambda value: key(value).startswith(prefix), self.irange(prefix)), limit))
+
+
+class InsertionLog:
+    # (номер, ключ) у порядку додавання для курсорів за record_id. Видалені ключі
+    # лишаються в журналі, доки їх не стане більше за живі, - тоді журнал стискається
+    def __init__(self, order):
+        self._order = order
+        self._seqs = array("q")
+        self._keys = []
+        self._dead = 0
+
+    def append(self, seq, key):
+        self._seqs.append(seq)
+        self._keys.append(key)
+
+    def discard(self):
+        self._dead += 1
+        if self._dead > max(1000, len(self._keys) // 2):
+            # порядок словника _order збігається з порядком номерів
+            self._seqs = array("q", self._order.values())
+            self._keys = list(self._order)
+            self._dead = 0
+
+    def after(self, seq, limit):
+        seqs, keys, order = self._seqs, self._keys, self._order
+        i = bisect_right(seqs, seq)
+        result = []
+        while i < len(keys) and len(result) < limit:
+            if order.get(keys[i]) == seqs[i]:
+                result.append((seqs[i], keys[i]))
+            i += 1
+        return result
+
+
+class BirthdayIndex:
+    # (місяць, день) -> ключі записів; вибірка на N днів коштує O(N + результат).
+    # Окремо - відсортовані пари (дата народження, ключ) для діапазонів дат, O(log n + результат)
+    def __init__(self):
+        self._by_day = defaultdict(dict)
+        self._by_key = {}
+        self._dates = SortedIndex()
+
+    def add(self, key, birthday):
+        self.remove(key)
+        if birthday is None:
+            return
+        born = birthday.date
+        month_day = (born.month, born.day)
+        self._by_day[month_day][key] = None
+        self._by_key[key] = born
+        self._dates.add((born, key))
+
+    def add_many(self, items):
+        # (ключ, день народження) для ключів, яких ще немає в індексі; дати сортуються разом
+        dates = []
+        for key, birthday in items:
+            if birthday is None:
+                continue
+            born = birthday.date
+            self._by_day[born.month, born.day][key] = None
+            self._by_key[key] = born
+            dates.append((born, key))
+        self._dates.update(dates)
+
+    def clear(self):
+        self._by_day.clear()
+        self._by_key.clear()
+        self._dates.clear()
+
+    def remove(self, key):
+        born = self._by_key.pop(key, None)
+        if born is None:
+            return
+        month_day = (born.month, born.day)
+        keys = self._by_day[month_day]
+        del keys[key]
+        if not keys:
+            del self._by_day[month_day]
+        self._dates.remove((born, key))
+
+    def between(self, start=None, end=None):
+        # ключі з датою народження від start до end включно, у порядку дат
+        low = (start,) if start is not None else None
+        if end is None or end == date.max:
+            high = None
+        else:
+            high = (end + timedelta(days=1),)
+        return [key for _, key in self._dates.irange(low, high, (True, False))]
+
+    def within(self, today, days):
+        # [(через скільки днів, ключ), ...]
+        result = []
+        for month_day, offset in birthday_window(today, days).items():
+            keys = self._by_day.get(month_day)
+            if keys:
+                result.extend((offset, key) for key in keys)
+        return result
+
+
+class ColumnarStore:
+    # Колонкове представлення книги для масових запитів: кожен запис - рядок,
+    # телефони - окремі рядки з посиланням на рядок запису. Видалення лише
+    # позначають рядки (-1 / 0), періодичне ущільнення прибирає їх.
+    def __init__(self):
+        self.rows = {}
+        self.keys = []
+        self.birth_ordinals = array("q")
+        self.birth_days = array("H")
+        self.phones = array("Q")
+        self.phone_rows = array("q")
+        self._phone_slots = defaultdict(list)
+        self._garbage = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, key, record):
+        row = len(self.keys)
+        self.rows[key] = row
+        self.keys.append(key)
+        self.birth_ordinals.append(0)
+        self.birth_days.append(0)
+        self.set_birthday(key, record.birthday)
+        for phone in record.phones:
+            self.add_phone(key, phone.value)
+
+    def remove(self, key):
+        row = self.rows.pop(key)
+        self.keys[row] = None
+        self.birth_ordinals[row] = 0
+        self.birth_days[row] = 0
+        slots = self._phone_slots.pop(row, ())
+        for position in slots:
+            self.phone_rows[position] = -1
+        self._garbage += 1 + len(slots)
+        self._maybe_compact()
+
+    def set_birthday(self, key, birthday):
+        row = self.rows[key]
+        if birthday is None:
+            self.birth_ordinals[row] = 0
+            self.birth_days[row] = 0
+        else:
+            born = birthday.date
+            self.birth_ordinals[row] = born.toordinal()
+            self.birth_days[row] = leap_day_of_year(born.month, born.day)
+
+    def add_phone(self, key, phone):
+        row = self.rows[key]
+        self._phone_slots[row].append(len(self.phones))
+        self.phones.append(int(phone))
+        self.phone_rows.append(row)
+
+    def remove_phone(self, key, phone):
+        row = self.rows[key]
+        number = int(phone)
+        slots = self._phone_slots[row]
+        for i, position in enumerate(slots):
+            if self.phones[position] == number:
+                self.phone_rows[position] = -1
+                del slots[i]
+                self._garbage += 1
+                break
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._garbage > 1024 and self._garbage * 2 > len(self.keys) + len(self.phones):
+            self.compact()
+
+    def compact(self):
+        keys = self.keys
+        ordinals, days = self.birth_ordinals, self.birth_days
+        phones, slots = self.phones, self._phone_slots
+        self.__init__()
+        for row in sorted(self.rows_of(keys)):
+            key = keys[row]
+            new_row = len(self.keys)
+            self.rows[key] = new_row
+            self.keys.append(key)
+            self.birth_ordinals.append(ordinals[row])
+            self.birth_days.append(days[row])
+            for position in slots.get(row, ()):
+                self._phone_slots[new_row].append(len(self.phones))
+                self.phones.append(phones[position])
+                self.phone_rows.append(new_row)
+
+    @staticmethod
+    def rows_of(keys):
+        return [row for row, key in enumerate(keys) if key is not None]
+
+    # Масові предикати повертають номери рядків. З NumPy масиви array
+    # переглядаються без копіювання, інакше працює звичайний цикл.
+
+    def phone_prefix_rows(self, prefix):
+        if not self.phones or len(prefix) > 10 or (prefix and not (prefix.isascii() and prefix.isdigit())):
+            return []
+        scale = 10 ** (10 - len(prefix))
+        low = int(prefix or 0) * scale
+        high = low + scale
+        if np is not None:
+            phones = np.frombuffer(self.phones, dtype=np.uint64)
+            rows = np.frombuffer(self.phone_rows, dtype=np.int64)
+            mask = (phones >= low) & (phones < high) & (rows >= 0)
+            return np.unique(rows[mask]).tolist()
+        return sorted({row for number, row in zip(self.phones, self.phone_rows) if row >= 0 and low <= number < high})
+
+    def birthday_rows(self, days_of_year):
+        if not self.birth_days or not days_of_year:
+            return []
+        if np is not None:
+            wanted = np.zeros(367, dtype=bool)
+            wanted[list(days_of_year)] = True
+            return np.flatnonzero(wanted[np.frombuffer(self.birth_days, dtype=np.uint16)]).tolist()
+        return [row for row, day in enumerate(self.birth_days) if day and day in days_of_year]
+
+    def born_between_rows(self, start, end):
+        if not self.birth_ordinals:
+            return []
+        low, high = max(start.toordinal(), 1), end.toordinal()
+        if np is not None:
+            ordinals = np.frombuffer(self.birth_ordinals, dtype=np.int64)
+            return np.flatnonzero((ordinals >= low) & (ordinals <= high)).tolist()
+        return [row for row, ordinal in enumerate(self.birth_ordinals) if low <= ordinal <= high]
+
+
 class AddressBook(UserDict):
     record_id = None
+    record_class = Record
 
-    def __init__(self, file="adress_book.pkl"):
-        self.file = Path(file)
+    def __init__(self, file="adress_book.pkl", storage=None, columnar=False):
+        self.storage = storage if storage is not None else PickleStorage(file)
+        self.file = self.storage.file
         self.record_id = 0
         self.record = {}
+        self._order = {}
+        self._dirty = set()
+        # record_id на момент останнього збереження: записи з більшим номером додані після нього
+        self._saved_id = 0
+        self._dump_lock = threading.Lock()
+        self._phone_index = NgramIndex()
+        self._name_index = NgramIndex()
+        self._birthday_index = BirthdayIndex()
+        self._names_lower = SortedIndex(key=str.lower)
+        self._phone_numbers = SortedIndex()
+        self._phone_owners = PhoneIndex()
+        self._fuzzy_names = BKTree()
+        # після defer_indexes() вторинні індекси (крім columns) не ведуться, а перебудовуються з data
+        # при першому запиті (_ensure_indexes)
+        self._indexes_stale = False
+        self._rebuild_lock = threading.Lock()
+        self._sorted_names = SortedIndex()
+        self._insertions = InsertionLog(self._order)
+        self.columns = ColumnarStore() if columnar else None
+        self.metrics = None
         super().__init__()
 
+    def __setitem__(self, key, record):
+        old = self.data.get(key)
+        if old is not None:
+            self._unindex(key, old)
+        else:
+            self.record_id += 1
+            self._order[key] = self.record_id
+            self._insertions.append(self.record_id, key)
+            if not self._indexes_stale:
+                self._sorted_names.add(key)
+                self._names_lower.add(key)
+        self.data[key] = record
+        self._index(key, record)
+        self._dirty.add(key)
+
+    def __delitem__(self, key):
+        record = self.data.pop(key)
+        del self._order[key]
+        self._insertions.discard()
+        if not self._indexes_stale:
+            self._sorted_names.remove(key)
+            self._names_lower.remove(key)
+        self._unindex(key, record)
+        self._dirty.add(key)
+
+    def _index(self, key, record):
+        record._book = self
+        if not self._indexes_stale:
+            self._name_index.add(key, record.name.value.lower())
+            self._fuzzy_names.add(key, record.name.value.lower())
+            for phone in record.phones:
+                self._phone_index.add(key, phone.value)
+                if self._phone_owners.add(key, phone.value):
+                    self._phone_numbers.add(phone.value)
+            self._birthday_index.add(key, record.birthday)
+        if self.columns is not None:
+            self.columns.add(key, record)
+
+    def _unindex(self, key, record):
+        if not self._indexes_stale:
+            self._name_index.remove(key, record.name.value.lower())
+            self._fuzzy_names.remove(key, record.name.value.lower())
+            for phone in record.phones:
+                self._phone_index.remove(key, phone.value)
+                if self._phone_owners.remove(key, phone.value):
+                    self._phone_numbers.remove(phone.value)
+            self._birthday_index.remove(key)
+        if self.columns is not None:
+            self.columns.remove(key)
+        # відв'язуємо запис останнім: доки _book вказує на книгу, Record._locked чекає на
+        # блокування, а не змінює телефони, які ми ще обходимо
+        if record._book is self:
+            record._book = None
+
+    def _reading(self):
+        # у звичайній книзі - без блокування; ConcurrentAddressBook повертає тут свої
+        # блокування на читання і на запис
+        return nullcontext()
+
+    def _writing(self):
+        return nullcontext()
+
+    def _birthday_changed(self, record):
+        self._dirty.add(record.name.value)
+        if not self._indexes_stale:
+            self._birthday_index.add(record.name.value, record.birthday)
+        if self.columns is not None:
+            self.columns.set_birthday(record.name.value, record.birthday)
+
+    def _phone_added(self, record, phone):
+        if not self._indexes_stale:
+            self._phone_index.add(record.name.value, phone)
+            if self._phone_owners.add(record.name.value, phone):
+                self._phone_numbers.add(phone)
+        self._dirty.add(record.name.value)
+        if self.columns is not None:
+            self.columns.add_phone(record.name.value, phone)
+
+    def _phone_removed(self, record, phone):
+        if not self._indexes_stale:
+            self._phone_index.remove(record.name.value, phone)
+            if self._phone_owners.remove(record.name.value, phone):
+                self._phone_numbers.remove(phone)
+        self._dirty.add(record.name.value)
+        if self.columns is not None:
+            self.columns.remove_phone(record.name.value, phone)
+
+    def _phone_edited(self, record, old_phone, new_phone):
+        self._phone_removed(record, old_phone)
+        self._phone_added(record, new_phone)
+
+    def _phones_replaced(self, record, old_phones, new_phones):
+        # record.phones = [...] для запису, що вже в книзі
+        for phone in old_phones:
+            self._phone_removed(record, phone)
+        for phone in new_phones:
+            self._phone_added(record, phone)
+
+    def defer_indexes(self):
+        # масове завантаження (load, імпорт): вторинні індекси - n-грами, BK-дерево, власники
+        # номерів, відсортовані імена й номери, дні народження - скидаються і до першого запиту
+        # не ведуться, тож кожен запис коштує лише словника і порядку. Перший запит до них
+        # будує їх одним проходом
+        self._indexes_stale = True
+        self._sorted_names.clear()
+        self._birthday_index.clear()
+        self._name_index.clear()
+        self._phone_index.clear()
+        self._fuzzy_names.clear()
+        self._phone_owners.clear()
+        self._names_lower.clear()
+        self._phone_numbers.clear()
+
+    def _ensure_indexes(self):
+        if not self._indexes_stale:
+            return
+        # у ConcurrentAddressBook сюди приходять читачі, тож будує лише один із них
+        with self._rebuild_lock:
+            if not self._indexes_stale:
+                return
+            started = perf_counter()
+            with gc_paused():
+                items = self.data.items()
+                self._sorted_names.update(self.data)
+                self._names_lower.update(self.data)
+                self._birthday_index.add_many((key, record.birthday) for key, record in items)
+                self._name_index.add_many((key, record.name.value.lower()) for key, record in items)
+                self._phone_index.add_many((key, phone.value) for key, record in items for phone in record.phones)
+                add_owner = self._phone_owners.add
+                self._phone_numbers.update([phone.value for key, record in items for phone in record.phones
+                                            if add_owner(key, phone.value)])
+                for key, record in items:
+                    self._fuzzy_names.add(key, record.name.value.lower())
+            self._indexes_stale = False
+            if self.metrics is not None:
+                self.metrics.observe("index_rebuild_seconds", perf_counter() - started)
+
+    def _candidates(self, index, term):
+        keys = index.candidates(term)
+        if self.metrics is not None:
+            self.metrics.inc("index_lookups_total", index="phone" if index is self._phone_index else "name",
+                             result="scan" if keys is None else "hit")
+        if keys is None:
+            return self.data.values()
+        return [self.data[key] for key in sorted(keys, key=self._order.__getitem__)]
+
+    def _records_for_rows(self, rows):
+        keys = [self.columns.keys[row] for row in rows]
+        return [self.data[key] for key in sorted(keys, key=self._order.__getitem__)]
+
+    def phones_with_prefix(self, prefix) -> List[Record]:
+        if self.columns is not None:
+            return self._records_for_rows(self.columns.phone_prefix_rows(prefix))
+        return [record for record in self.data.values()
+                if any(phone.value.startswith(prefix) for phone in record.phones)]
+
+    def born_between(self, start, end) -> List[Record]:
+        if self.columns is not None:
+            return self._records_for_rows(self.columns.born_between_rows(start, end))
+        self._ensure_indexes()
+        keys = self._birthday_index.between(start, end)
+        return [self.data[key] for key in sorted(keys, key=self._order.__getitem__)]
+
+    def range_by_birthday(self, start=None, end=None) -> List[Record]:
+        # записи, народжені від start до end включно (None - без межі), у порядку дат; O(log n + k)
+        self._ensure_indexes()
+        return [self.data[key] for key in self._birthday_index.between(start, end)]
+
+    def range_by_name(self, low=None, high=None, inclusive=(True, True)) -> List[Record]:
+        # записи з іменами від low до high у порядку імен, наприклад range_by_name("A", "D", (True, False))
+        # - усі контакти на A-C; O(log n + k)
+        self._ensure_indexes()
+        return [self.data[key] for key in self._sorted_names.irange(low, high, inclusive)]
+
+    def birthdays_within(self, days) -> List[Record]:
+        window = birthday_window(date.today(), days)
+        if self.columns is not None:
+            by_day = {leap_day_of_year(month, day): offset for (month, day), offset in window.items()}
+            found = [self.data[self.columns.keys[row]] for row in self.columns.birthday_rows(by_day)]
+        else:
+            found = [record for record in self.data.values() if record.birthday
+                     and (record.birthday.date.month, record.birthday.date.day) in window]
+        found.sort(key=lambda record: (window[record.birthday.date.month, record.birthday.date.day],
+                                       self._order[record.name.value]))
+        return found
+
+    def find_by_phone(self, phone):
+        # номер у будь-якому записі, що приймає Phone -> власник (запис, що отримав номер
+        # першим) або None
+        self._ensure_indexes()
+        key = self._phone_owners.owner(normalize_phone(phone))
+        if self.metrics is not None:
+            self.metrics.inc("index_lookups_total", index="phone_exact", result="hit" if key is not None else "miss")
+        return self.data[key] if key is not None else None
+
+    def find_by_phones(self, phones) -> List[Record]:
+        # пакетний варіант: список власників (або None) у порядку номерів
+        self._ensure_indexes()
+        data = self.data
+        owners = self._phone_owners.owners(map(normalize_phone, phones))
+        return [data[key] if key is not None else None for key in owners]
+
+    def fuzzy_search(self, term: str, k=2, limit=None, exhaustive=True) -> List[Record]:
+        # записи з іменем на відстані Левенштейна <= k від term (без урахування регістру),
+        # спершу найближчі, при рівній відстані - у порядку додавання.
+        # exhaustive=False - лише серед імен, що вже в BK-дереві: швидка підказка, яка
+        # доповнюється з кожним пошуком, поки дерево добудовується після завантаження
+        self._ensure_indexes()
+        found = self._fuzzy_names.search(term.lower(), k, pending=exhaustive)
+        found.sort(key=lambda item: (item[0], self._order[item[1]]))
+        if limit is not None:
+            found = found[:limit]
+        return [self.data[key] for _, key in found]
+
+    def complete_names(self, prefix, limit=None) -> List[str]:
+        # імена контактів, що починаються з prefix (без урахування регістру), за абеткою
+        self._ensure_indexes()
+        return self._names_lower.prefixed(prefix.lower(), limit)
+
+    def complete_phones(self, prefix, limit=None) -> List[str]:
+        self._ensure_indexes()
+        return self._phone_numbers.prefixed(prefix, limit)
+
+    def upcoming_birthdays(self, days) -> List[Record]:
+        self._ensure_indexes()
+        found = self._birthday_index.within(date.today(), days)
+        found.sort(key=lambda item: (item[0], self._order[item[1]]))
+        return [self.data[key] for _, key in found]
+
     def add_record(self, record):
-        self.data[record.name.value] = record
+        self[record.name.value] = record
+
+    def add_records(self, records, dirty=True):
+        # масове додавання: індекси оновлюються один раз на весь пакет
+        with gc_paused():
+            return self._add_records(records, dirty)
+
+    def _add_records(self, records, dirty):
+        batch = {}
+        for record in records:
+            batch[record.name.value] = record
+        new_keys = []
+        for key, record in batch.items():
+            old = self.data.get(key)
+            if old is not None:
+                self._unindex(key, old)
+            else:
+                self.record_id += 1
+                self._order[key] = self.record_id
+                self._insertions.append(self.record_id, key)
+                new_keys.append(key)
+            self.data[key] = record
+            record._book = self
+
+        if not self._indexes_stale:
+            self._sorted_names.update(new_keys)
+            self._names_lower.update(new_keys)
+            self._name_index.add_many((key, record.name.value.lower()) for key, record in batch.items())
+            self._phone_index.add_many((key, phone.value) for key, record in batch.items()
+                                       for phone in record.phones)
+            new_phones = []
+            for key, record in batch.items():
+                self._fuzzy_names.add(key, record.name.value.lower())
+                for phone in record.phones:
+                    if self._phone_owners.add(key, phone.value):
+                        new_phones.append(phone.value)
+            self._phone_numbers.update(new_phones)
+            for key, record in batch.items():
+                if record.birthday is not None:
+                    self._birthday_index.add(key, record.birthday)
+        if self.columns is not None:
+            for key, record in batch.items():
+                self.columns.add(key, record)
+        if dirty:
+            self._dirty.update(batch)
+        else:
+            self._dirty.difference_update(batch)
+        return len(batch)
 
     def find(self, term):
 
@@ -137,44 +1454,167 @@ class AddressBook(UserDict):
 
     def delete(self, name):
         if name in self.data:
-            del self.data[name]
+            del self[name]
 
     def __iter__(self):
         return iter(self.data.values())
 
     def iterator(self, item_number):
-        counter = 0
-        result = []
-        for item, record in self.data.items():
-            result.append(record)
-            counter += 1
-            if counter >= item_number:
-                yield result
-                counter = 0
-                result = []
-
-    def dump(self):
-        with open(self.file, "wb") as file:
-            pickle.dump((self.record_id, dict(self.data)), file)
+        # сторінки за курсором: зміни книги між сторінками не ламають обхід
+        cursor = None
+        while True:
+            records, cursor = self.page(cursor, item_number)
+            if records:
+                yield records
+            if cursor is None:
+                return
+
+    def page(self, cursor=None, limit=50, order="id"):
+        # сторінка записів після cursor і курсор наступної сторінки (None - сторінок більше немає).
+        # order="id" - порядок додавання (курсор - record_id запису), order="name" - за іменем
+        if limit <= 0:
+            raise ValueError("Page limit must be positive.")
+        if order == "id":
+            found = self._insertions.after(cursor or 0, limit + 1)
+            keys = [key for _, key in found]
+            positions = [seq for seq, _ in found]
+        elif order == "name":
+            self._ensure_indexes()
+            if cursor is None:
+                keys = list(islice(self._sorted_names.irange(), limit + 1))
+            else:
+                keys = list(islice(self._sorted_names.irange(cursor, None, (False, True)), limit + 1))
+            positions = keys
+        else:
+            raise ValueError(f"Unknown page order: {order}")
+        next_cursor = positions[limit - 1] if len(keys) > limit else None
+        return [self.data[key] for key in keys[:limit]], next_cursor
+
+    def dump(self, lock=None):
+        # зберігає зміни з останнього збереження. Якщо сховище вміє encode/write, зміни
+        # серіалізуються під lock і блокуванням книги, а пишуться на диск уже без них.
+        # При помилці зміни повертаються в _dirty до наступної спроби
+        lock = lock if lock is not None else nullcontext()
+        with self._dump_lock:
+            started = perf_counter()
+            encode = getattr(self.storage, "encode", None)
+            with lock, self._reading():
+                changed, self._dirty = self._dirty, set()
+                saved_id = self._saved_id
+                try:
+                    if encode is None:
+                        self.storage.save(self, changed)
+                    else:
+                        payload = encode(self, changed)
+                except Exception:
+                    self._dirty |= changed
+                    raise
+                self._saved_id = self.record_id
+            if encode is not None:
+                try:
+                    self.storage.write(payload)
+                except Exception:
+                    with lock, self._writing():
+                        self._dirty |= changed
+                        self._saved_id = min(self._saved_id, saved_id)
+                    raise
+            if self.metrics is not None:
+                self.metrics.record_io("save", perf_counter() - started, getattr(self.storage, "last_bytes", 0))
 
     def load(self):
-        if not self.file.exists():
+        started = perf_counter()
+        loaded = self.storage.load()
+        if loaded is None:
             return
-        with open(self.file, "rb") as file:
-            self.record_id, data = pickle.load(file)
-            self.data.update(data)
+        record_id, data = loaded
+        self.defer_indexes()
+        # сховище може віддати словник або потік пар (ключ, запис) - читаємо пакетами
+        items = iter(data.items() if hasattr(data, "items") else data)
+        while True:
+            records = [record for _, record in islice(items, 10_000)]
+            if not records:
+                break
+            self.add_records(records, dirty=False)
+        self.record_id = max(self.record_id, record_id)
+        self._saved_id = self.record_id
+        if self.metrics is not None:
+            self.metrics.record_io("load", perf_counter() - started, getattr(self.storage, "last_bytes", 0))
+
+    def close(self):
+        self.storage.close()
 
     def find_by_term(self, term: str) -> List[Record]:
+        self._ensure_indexes()
         matching_records = []
 
-        for record in self.data.values():
+        for record in self._candidates(self._phone_index, term):
             for phone in record.phones:
                 if term in phone.value:
                     matching_records.append(record)
 
-        matching_records.extend(record for record in self.data.values() if term.lower() in record.name.value.lower())
+        lowered = term.lower()
+        matching_records.extend(record for record in self._candidates(self._name_index, lowered)
+                                if lowered in record.name.value.lower())
         return matching_records
 
+    def search(self, term: str, limit=None) -> List[Record]:
+        if limit is not None and limit <= 0:
+            return []
+        self._ensure_indexes()
+        lowered = term.lower()
+        if limit is not None:
+            return self._search_top(term, lowered, limit)
+        phone_keys = self._phone_index.candidates(term)
+        name_keys = self._name_index.candidates(lowered)
+        if self.metrics is not None:
+            self.metrics.inc("index_lookups_total", index="search",
+                             result="scan" if phone_keys is None or name_keys is None else "hit")
+        if phone_keys is None or name_keys is None:
+            candidates = self.data.values()
+        else:
+            keys = sorted(phone_keys | name_keys, key=self._order.__getitem__)
+            candidates = (self.data[key] for key in keys)
+        return rank_records(candidates, term, limit)
+
+    def _search_top(self, term, lowered, limit):
+        # перші limit збігів без ранжування всієї книги: точні й префіксні збіги беруться
+        # прямо з відсортованих індексів імен і номерів, підрядкові - з n-грамних кандидатів
+        # у порядку додавання, поки не набереться limit
+        order = self._order.__getitem__
+        name_keys = self._names_lower.prefixed(lowered)
+        numbers = self._phone_numbers.prefixed(term)
+        exact = {key for key in name_keys if key.lower() == lowered}
+        exact.update(self._phone_owners.keys(term))
+        prefix = set(name_keys)
+        for number in numbers:
+            prefix.update(self._phone_owners.keys(number))
+        prefix -= exact
+
+        keys = heapq.nsmallest(limit, exact, key=order)
+        if len(keys) < limit:
+            keys += heapq.nsmallest(limit - len(keys), prefix, key=order)
+        if len(keys) < limit:
+            keys += islice(self._substring_matches(term, lowered, exact | prefix), limit - len(keys))
+        return [self.data[key] for key in keys]
+
+    def _substring_matches(self, term, lowered, seen):
+        # ключі з term усередині імені чи номера, у порядку додавання, крім seen
+        phone_keys = self._phone_index.candidates(term)
+        name_keys = self._name_index.candidates(lowered)
+        if self.metrics is not None:
+            self.metrics.inc("index_lookups_total", index="search",
+                             result="scan" if phone_keys is None or name_keys is None else "hit")
+        if phone_keys is None or name_keys is None:
+            keys = (key for key in self.data if key not in seen)
+        else:
+            heap = [(self._order[key], key) for key in phone_keys | name_keys if key not in seen]
+            heapq.heapify(heap)
+            keys = (heapq.heappop(heap)[1] for _ in range(len(heap)))
+        for key in keys:
+            record = self.data[key]
+            if lowered in record.name.value.lower() or any(term in phone.value for phone in record.phones):
+                yield key
+
 
     # if __name__ == "__main__":
     #
@@ -185,57 +1625,232 @@ class AddressBook(UserDict):
     #         else:
     #             return None
 
+COMPLETION_LIMIT = 100
+LIST_PAGE_SIZE = 20
+BATCH_OUTPUT_BUFFER = 1 << 16
+
+
 class Controller(cmd.Cmd):
-    def __init__(self):
+    def __init__(self, compact=False, autosave=5.0, metrics=None):
         super().__init__()
-        self.book = AddressBook()
+        self.record_class = CompactRecord if compact else Record
+        self.book = AddressBook(storage=JournalStorage("adress_book.pkl"))
+        # метрики вмикаються параметром або змінною середовища ADDRESS_BOOK_METRICS=1
+        if metrics is None:
+            metrics = bool(os.environ.get("ADDRESS_BOOK_METRICS"))
+        self.metrics = Metrics() if metrics else None
+        self.book.metrics = self.metrics
+        self._list_cursor = None
+        self._list_order, self._list_size = "id", LIST_PAGE_SIZE
+        self.batch = False
+        # команди виконуються під lock, автозбереження серіалізує зміни під ним же,
+        # а пише на диск у фоновому потоці - prompt не чекає на диск
+        self.lock = threading.Lock()
+        self.autosaver = AutoSaver(self.book, autosave, self.lock) if autosave else None
         self.prompt = ">>>"
         self.intro = "Ласкаво просимо до Адресної Книги"
 
+    def run_batch(self, lines, out=None):
+        # пакетний режим: команди зі скрипта або stdin без prompt і без input().
+        # Послідовні add або delete - одна транзакція: add перевіряються по одному, а додаються
+        # одним add_records, delete виконуються разом під одним блокуванням книги.
+        # Вивід буферизується, книга зберігається один раз у кінці - навіть якщо скрипт
+        # обірвався винятком. GC вимкнений на весь скрипт: скрипт створює лише живі
+        # записи, а повні проходи GC по них коштували б більше, ніж саме додавання.
+        out = out if out is not None else sys.stdout
+        self.batch = True
+        pending = []
+        pending_command = None
+        buffer = io.StringIO()
+
+        def commit():
+            nonlocal pending_command
+            if not pending:
+                pending_command = None
+                return
+            if pending_command == "add":
+                with self.lock:
+                    self.book.add_records(pending)
+                print(f"Додано контактів: {len(pending)}")
+            elif pending_command == "delete":
+                with self.lock, self.book._writing():
+                    for name in pending:
+                        self.do_delete(name)
+            pending.clear()
+            pending_command = None
+
+        try:
+            with redirect_stdout(buffer), gc_paused():
+                try:
+                    for line_number, line in enumerate(lines, 1):
+                        line = line.strip()
+                        if not line or line.startswith("#"):
+                            continue
+                        command, arg, _ = self.parseline(line)
+                        if command != pending_command:
+                            commit()
+                        if command == "add":
+                            try:
+                                pending.append(self.parse_add(arg))
+                            except ValueError as e:
+                                print(f"рядок {line_number}: помилка при створенні контакту: {e}")
+                            pending_command = command
+                            continue
+                        if command == "delete":
+                            pending.append(arg)
+                            pending_command = command
+                            continue
+                        if command == "exit":
+                            break
+                        self.onecmd(line)
+                        if buffer.tell() >= BATCH_OUTPUT_BUFFER:
+                            out.write(buffer.getvalue())
+                            buffer.seek(0)
+                            buffer.truncate()
+                finally:
+                    try:
+                        commit()
+                    finally:
+                        self.book.dump()
+                        print("Адресна книга збережена!")
+        finally:
+            out.write(buffer.getvalue())
+            out.flush()
+            self.book.close()
+
+    def preloop(self):
+        if self.autosaver is not None:
+            self.autosaver.start()
+
+    def postloop(self):
+        if self.autosaver is not None:
+            self.autosaver.stop()
+        else:
+            self.book.dump()
+        self.book.close()
+
+    def onecmd(self, line):
+        # термін для find без аргументу питаємо ще до блокування: поки користувач думає
+        # над відповіддю, автозбереження (AutoSaver під тим самим lock) не має чекати
+        command, arg, _ = self.parseline(line)
+        if command == "find" and not arg and not self.batch:
+            line = "find " + input("Введіть термін для пошуку: ")
+        with self.lock:
+            if self.metrics is None:
+                return super().onecmd(line)
+            started = perf_counter()
+            try:
+                return super().onecmd(line)
+            finally:
+                command = self.parseline(line)[0]
+                if not command or not hasattr(self, "do_" + command):
+                    command = "unknown"
+                self.metrics.observe("command_seconds", perf_counter() - started, command=command)
+
     def do_exit(self, arg):
-        self.book.dump()
+        # збереження і закриття книги - у postloop, вже поза lock
         print("Вихід...")
         return True
 
     def do_save(self, arg):
-        self.book.dump()
-        print("Адресна книга збережена!")
+        if self.batch:
+            print("Пакетний режим: книга буде збережена після виконання скрипта")
+            return
+        if self.autosaver is None:
+            self.book.dump()
+            print("Адресна книга збережена!")
+            return
+        if self.autosaver.error is not None:
+            print(f"помилка автозбереження: {self.autosaver.error}")
+        self.autosaver.request()
+        print("Адресна книга зберігається у фоні")
 
     def do_load(self, arg):
         self.book.load()
         print("Адресна книга відновлена")
 
-    def do_add(self, line):
+    def parse_add(self, line):
+        # "ім'я, телефон, телефон, день народження" -> запис; ValueError, якщо дані невірні
         data = line.split(",")
         name = data[0].strip().capitalize()
         phones = [phone.strip() for phone in data[1:3]]
         birthday = data[3].strip() if len(data) > 3 else None
-        try:
-            record = Record(name)
-            for phone in phones:
-                record.add_phone(phone)
-            if birthday:
-                record.add_birthday(birthday)
+        record = self.record_class(name)
+        for phone in phones:
+            record.add_phone(phone)
+        if birthday:
+            record.add_birthday(birthday)
+        return record
 
+    def do_add(self, line):
+        try:
+            record = self.parse_add(line)
             self.book.add_record(record)
             print("Новий контакт успішно збережено!")
         except ValueError as e:
             print(f"помилка при створенні контакту: {e}")
 
+    def do_import(self, line):
+        path = line.strip()
+        if not path:
+            print("Вкажіть файл: import contacts.csv або import contacts.jsonl")
+            return
+        try:
+            report = import_file(self.book, path, record_class=self.record_class, capitalize=True)
+        except (OSError, ValueError) as e:
+            print(f"помилка імпорту: {e}")
+            return
+        print(f"Імпортовано контактів: {report.imported}, помилок: {len(report.errors)}")
+        for line_number, message in report.errors[:10]:
+            print(f" рядок {line_number}: {message}")
+        if len(report.errors) > 10:
+            print(f" ... та ще {len(report.errors) - 10}")
 
 
+    def do_export(self, line):
+        path = line.strip()
+        if not path:
+            print("Вкажіть файл: export contacts.csv, contacts.jsonl або contacts.msgpack")
+            return
+        try:
+            count = export_file(self.book, path)
+        except (OSError, ValueError) as e:
+            print(f"помилка експорту: {e}")
+            return
+        print(f"Експортовано контактів: {count}")
+
     def do_list(self, arg):
-        if not self.book.data:
-            print("Адресна книга порожня.")
+        # list [name] [N] - перша сторінка з N записів (за іменем або порядком додавання),
+        # list next - наступна сторінка
+        args = arg.split()
+        if args[:1] == ["next"]:
+            if self._list_cursor is None:
+                print("Більше записів немає.")
+                return
+            order, size, cursor = self._list_order, self._list_size, self._list_cursor
         else:
-            for record_id, record in self.book.data.items():
-                phones = '; '.join(str(phone) for phone in record.phones)
-                birthday_info = f", День народження: {record.birthday.value}" if record.birthday else ""
-                print(f"{record_id}: {record.name.value}, {phones}{birthday_info}")
+            order = "name" if "name" in args else "id"
+            size = next((int(a) for a in args if a.isdigit() and int(a) > 0), LIST_PAGE_SIZE)
+            cursor = None
+        records, self._list_cursor = self.book.page(cursor, size, order)
+        self._list_order, self._list_size = order, size
+        if not records and cursor is None:
+            print("Адресна книга порожня.")
+            return
+        for record in records:
+            phones = '; '.join(str(phone) for phone in record.phones)
+            birthday_info = f", День народження: {record.birthday.value}" if record.birthday else ""
+            print(f"{record.name.value}: {record.name.value}, {phones}{birthday_info}")
+        if self._list_cursor is not None:
+            print("... наступна сторінка: list next")
 
     def do_find(self, arg):
-        term = input("Введіть термін для пошуку: ")
-        matching_records = self.book.find_by_term(term)
+        # без аргументу термін уже запитав onecmd (поза lock); у пакетному режимі питати нема кого
+        term = arg.strip()
+        if not term and self.batch:
+            print("Вкажіть термін для пошуку: find <термін>")
+            return
+        matching_records = self.book.search(term)
         if matching_records:
             for record in matching_records:
                 phones = ", ".join(phone.value for phone in record.phones )
@@ -243,6 +1858,9 @@ class Controller(cmd.Cmd):
                 print(f" {record.name.value}, {phones}{birthday_info}")
         else:
             print("Ничего не найдено!!!.")
+            similar = self.book.fuzzy_search(term, limit=5, exhaustive=False)
+            if similar:
+                print("Можливо, ви мали на увазі: " + ", ".join(record.name.value for record in similar))
 
     def do_birthday(self, line):
         name = line.strip().capitalize()
@@ -259,9 +1877,86 @@ class Controller(cmd.Cmd):
         else:
             print(f"контакт {name} не знайдений")
 
+    def do_delete(self, line):
+        name = line.strip()
+        if name not in self.book:
+            name = name.capitalize()
+        if name in self.book:
+            self.book.delete(name)
+            print(f"контакт {name} видалено")
+        else:
+            print(f"контакт {name} не знайдений")
+
+    # --- автодоповнення (Tab) ---
+
+    def complete_names(self, text, line, begidx, endidx):
+        return self.book.complete_names(text, COMPLETION_LIMIT)
+
+    complete_birthday = complete_names
+    complete_delete = complete_names
+
+    def complete_find(self, text, line, begidx, endidx):
+        if text.isdigit():
+            return self.book.complete_phones(text, COMPLETION_LIMIT)
+        return self.book.complete_names(text, COMPLETION_LIMIT)
+
+    def do_stats(self, line):
+        if self.metrics is None:
+            print("Статистика вимкнена: запустіть з ADDRESS_BOOK_METRICS=1")
+            return
+        path = line.strip()
+        if path:
+            try:
+                self.metrics.export(path)
+            except OSError as e:
+                print(f"помилка експорту статистики: {e}")
+                return
+            print(f"Статистику збережено у {path}")
+            return
+        snapshot = self.metrics.snapshot()
+        for histogram in snapshot["histograms"]:
+            labels = "".join(f" {key}={value}" for key, value in histogram["labels"].items())
+            average = histogram["sum"] / histogram["count"] * 1000 if histogram["count"] else 0
+            print(f" {histogram['name']}{labels}: {histogram['count']} раз, середнє {average:.2f} мс, "
+                  f"p50 <= {histogram['p50'] * 1000:g} мс, p99 <= {histogram['p99'] * 1000:g} мс")
+        for counter in snapshot["counters"]:
+            labels = "".join(f" {key}={value}" for key, value in counter["labels"].items())
+            print(f" {counter['name']}{labels}: {counter['value']}")
+
+    def do_upcoming(self, line):
+        try:
+            days = int(line.strip() or 7)
+        except ValueError:
+            print("Вкажіть кількість днів числом, наприклад: upcoming 7")
+            return
+        records = self.book.upcoming_birthdays(days)
+        if not records:
+            print(f"У найближчі {days} днів немає днів народження")
+            return
+        for record in records:
+            days_until_birthday = record.days_to_birthday()
+            when = "сьогодні" if days_until_birthday == 0 else f"через {days_until_birthday} днів"
+            print(f" {record.name.value}, {record.birthday.value} - {when}")
+
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Address book")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="SCRIPT",
+                        help="run commands from SCRIPT (or stdin) without prompts and save once at the end")
+    args = parser.parse_args()
+    if args.batch:
+        controller = Controller(autosave=None)
+        # скрипт працює зі збереженою книгою: dump дописує журнал, тож delete/find/list
+        # мусять бачити ті самі записи
+        controller.book.load()
+        if args.batch == "-":
+            controller.run_batch(sys.stdin)
+        else:
+            with open(args.batch, encoding="utf-8") as script:
+                controller.run_batch(script)
+        sys.exit()
+
     controller = Controller()
 
     # Перевірка на коректність веденого номера телефону setter для value класу Phone.
@@ -345,7 +2040,7 @@ if __name__ == "__main__":
 
 # Ласкаво просимо до Адресної Книги
 # >>>add ron,1234567890,1992-12-12
-# помилка при створенні контакту: Phone must be a string containing only digits.
+# помилка при створенні контакту: Phone must be a 10-digit number.
 # >>>add ron, 1234567890,0987654321
 # Новий контакт успішно збережено!
 # >>>add roki, 1234567890,0987654321, 1992-12-12
@@ -0,0 +1,110 @@
+import json
+import threading
+from collections import Counter
+from pathlib import Path
+
+# Необов'язкова інструментація. Книга і Controller тримають metrics = None і
+# перевіряють лише "is not None", тож вимкнені метрики нічого не коштують.
+# Експорт - текстовий формат Prometheus (.prom, .txt) або JSON (.json).
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        # верхня межа кошика, в який потрапляє квантиль
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self, prefix="address_book"):
+        self.prefix = prefix
+        self.counters = Counter()
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self.counters[self._key(name, labels)] += value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_io(self, operation, seconds, nbytes):
+        # operation - "save" або "load"
+        self.observe(f"{operation}_seconds", seconds)
+        self.inc(f"{operation}_bytes_total", nbytes)
+
+    # --- експорт ---
+
+    def snapshot(self):
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                           "p50": h.quantile(0.5), "p99": h.quantile(0.99),
+                           "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.buckets))}
+                          for (name, labels), h in sorted(self.histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    @staticmethod
+    def _labels(labels, **extra):
+        labels = {**labels, **extra}
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        for counter in snapshot["counters"]:
+            lines.append(f"{self.prefix}_{counter['name']}{self._labels(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name = f"{self.prefix}_{histogram['name']}"
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(histogram['labels'], le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{self._labels(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        path = Path(path)
+        text = self.to_json() if path.suffix == ".json" else self.to_prometheus()
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
@@ -0,0 +1,320 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import weakref
+from contextlib import nullcontext
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import List
+
+from main import Birthday, Phone, Record, birthday_window, rank_records
+
+# Двійковий формат книги для читання через mmap:
+#   заголовок  HEADER: magic, кількість записів, зсув індексу, record_id
+#   записи     RECORD: довжина імені, довжина дня народження, кількість телефонів,
+#              далі ім'я (utf-8), день народження (ascii) і телефони як uint64
+#   індекс     пари (8-байтовий хеш імені, зсув запису), відсортовані за хешем
+# Відкриття файлу читає лише заголовок, find - бінарний пошук в індексі,
+# iterator декодує записи по черзі.
+
+MAGIC = b"ABMMAP01"
+HEADER = struct.Struct("<8sQQQ")
+RECORD = struct.Struct("<HBI")
+INDEX_ENTRY = struct.Struct("<QQ")
+
+
+def name_hash(name):
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+def encode_record(record):
+    name = record.name.value.encode()
+    birthday = record.birthday.value.encode() if record.birthday else b""
+    phones = array("Q", (int(phone.value) for phone in record.phones))
+    return RECORD.pack(len(name), len(birthday), len(phones)) + name + birthday + phones.tobytes()
+
+
+def write_mapped(path, records, record_id=0):
+    # потоковий запис: у пам'яті тримаються лише пари індексу
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    index = []
+    with open(tmp, "wb") as file:
+        file.write(HEADER.pack(MAGIC, 0, 0, 0))
+        offset = HEADER.size
+        for record in records:
+            data = encode_record(record)
+            index.append((name_hash(record.name.value), offset))
+            file.write(data)
+            offset += len(data)
+        index.sort()
+        for entry in index:
+            file.write(INDEX_ENTRY.pack(*entry))
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, len(index), offset, record_id))
+    os.replace(tmp, path)
+    return len(index)
+
+
+class MappedAddressBook:
+    # Сумісна з AddressBook книга поверх файлу у форматі write_mapped.
+    # Змінені, нові та видалені записи тримаються в пам'яті (overlay) до dump(),
+    # який потоково переписує файл.
+    record_class = Record
+
+    def __init__(self, file="adress_book.abm"):
+        self.file = Path(file)
+        self._map = None
+        self._count = 0
+        self._index_offset = HEADER.size
+        self._file_record_id = 0
+        self._overlay = {}
+        self._added = {}
+        self._deleted = set()
+        self._records = weakref.WeakValueDictionary()
+        self.load()
+
+    # --- файл ---
+
+    def load(self):
+        self._close_map()
+        self._overlay.clear()
+        self._added.clear()
+        self._deleted.clear()
+        self._records = weakref.WeakValueDictionary()
+        if not self.file.exists():
+            self._count, self._index_offset, self._file_record_id = 0, HEADER.size, 0
+            return
+        with open(self.file, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._index_offset, self._file_record_id = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._close_map()
+            raise ValueError(f"{self.file} is not a mapped address book file")
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _decode(self, offset):
+        name_len, birthday_len, phone_count = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        name = self._map[start:start + name_len].decode()
+        start += name_len
+        birthday = self._map[start:start + birthday_len].decode()
+        start += birthday_len
+        phones = array("Q")
+        phones.frombytes(self._map[start:start + 8 * phone_count])
+        return name, birthday, phones, start + 8 * phone_count
+
+    def _materialize(self, offset):
+        name, birthday, phones, _ = self._decode(offset)
+        record = self._records.get(name)
+        if record is None:
+            record = self.record_class(name)
+            record.birthday = Birthday(birthday) if birthday else None
+            record.phones = [Phone.trusted(f"{number:010d}") for number in phones]
+            record._book = self
+            self._records[name] = record
+        return record
+
+    def _name_at(self, offset):
+        name_len = RECORD.unpack_from(self._map, offset)[0]
+        start = offset + RECORD.size
+        return self._map[start:start + name_len].decode()
+
+    def _file_offset(self, name):
+        if not self._count:
+            return None
+        wanted = name_hash(name)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX_ENTRY.unpack_from(self._map, self._index_offset + mid * INDEX_ENTRY.size)[0] < wanted:
+                lo = mid + 1
+            else:
+                hi = mid
+        # однаковий хеш можуть мати кілька імен - перевіряємо всі
+        while lo < self._count:
+            entry_hash, offset = INDEX_ENTRY.unpack_from(self._map, self._index_offset + lo * INDEX_ENTRY.size)
+            if entry_hash != wanted:
+                return None
+            if self._name_at(offset) == name:
+                return offset
+            lo += 1
+        return None
+
+    def _file_records(self):
+        offset = HEADER.size
+        while offset < self._index_offset:
+            name_len, birthday_len, phone_count = RECORD.unpack_from(self._map, offset)
+            name = self._name_at(offset)
+            if name in self._overlay:
+                yield self._overlay[name]
+            elif name not in self._deleted:
+                yield self._materialize(offset)
+            offset += RECORD.size + name_len + birthday_len + 8 * phone_count
+
+    # --- інтерфейс AddressBook ---
+
+    @property
+    def record_id(self):
+        return self._file_record_id + len(self._added)
+
+    def __len__(self):
+        return self._count - len(self._deleted) + len(self._added)
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def __getitem__(self, name):
+        record = self.find(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __setitem__(self, name, record):
+        old = self._overlay.get(name) or self._records.get(name)
+        if old is not None and old is not record and old._book is self:
+            old._book = None
+        if name not in self._overlay and self._file_offset(name) is None:
+            self._added[name] = record
+        elif name in self._added:
+            self._added[name] = record
+        self._deleted.discard(name)
+        self._overlay[name] = record
+        self._records[name] = record
+        record._book = self
+
+    def __delitem__(self, name):
+        if self.find(name) is None:
+            raise KeyError(name)
+        record = self._overlay.pop(name, None) or self._records.get(name)
+        if record is not None and record._book is self:
+            record._book = None
+        self._records.pop(name, None)
+        if self._added.pop(name, None) is None:
+            self._deleted.add(name)
+
+    def __iter__(self):
+        if self._map is not None:
+            yield from self._file_records()
+        yield from self._added.values()
+
+    def keys(self):
+        return [record.name.value for record in self]
+
+    def values(self):
+        return iter(self)
+
+    def items(self):
+        return ((record.name.value, record) for record in self)
+
+    def add_record(self, record):
+        self[record.name.value] = record
+
+    def add_records(self, records):
+        count = 0
+        for record in records:
+            self[record.name.value] = record
+            count += 1
+        return count
+
+    def find(self, term):
+        if term in self._overlay:
+            return self._overlay[term]
+        if term in self._deleted:
+            return None
+        offset = self._file_offset(term)
+        return self._materialize(offset) if offset is not None else None
+
+    def delete(self, name):
+        if name in self:
+            del self[name]
+
+    def iterator(self, item_number):
+        page = []
+        for record in self:
+            page.append(record)
+            if len(page) >= item_number:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def find_by_term(self, term: str) -> List[Record]:
+        matching_records = []
+        lowered = term.lower()
+        names = []
+        for record in self:
+            matching_records.extend(record for phone in record.phones if term in phone.value)
+            if lowered in record.name.value.lower():
+                names.append(record)
+        return matching_records + names
+
+    def search(self, term: str, limit=None) -> List[Record]:
+        return rank_records(iter(self), term, limit)
+
+    def upcoming_birthdays(self, days) -> List[Record]:
+        window = birthday_window(date.today(), days)
+        found = [(window[record.birthday.date.month, record.birthday.date.day], position, record)
+                 for position, record in enumerate(self)
+                 if record.birthday and (record.birthday.date.month, record.birthday.date.day) in window]
+        found.sort(key=lambda item: item[:2])
+        return [record for _, _, record in found]
+
+    def dump(self):
+        if not self._overlay and not self._deleted and self._map is not None:
+            return
+        write_mapped(self.file, iter(self), self.record_id)
+        live = list(self._records.values())
+        self.load()
+        for record in live:
+            self._records[record.name.value] = record
+
+    def close(self):
+        self._close_map()
+
+    # --- сповіщення від Record ---
+
+    def _writing(self):
+        return nullcontext()
+
+    def _record_changed(self, record):
+        name = record.name.value
+        if name not in self._overlay:
+            self._overlay[name] = record
+
+    def _birthday_changed(self, record):
+        self._record_changed(record)
+
+    def _phone_added(self, record, phone):
+        self._record_changed(record)
+
+    def _phone_removed(self, record, phone):
+        self._record_changed(record)
+
+    def _phone_edited(self, record, old_phone, new_phone):
+        self._record_changed(record)
+
+    def _phones_replaced(self, record, old_phones, new_phones):
+        self._record_changed(record)
+
+
+if __name__ == "__main__":
+    from main import AddressBook
+    from storage import JournalStorage
+
+    parser = argparse.ArgumentParser(description="Convert a pickled address book into the mmap format")
+    parser.add_argument("source", help="adress_book.pkl")
+    parser.add_argument("target", help="adress_book.abm")
+    args = parser.parse_args()
+
+    book = AddressBook(storage=JournalStorage(args.source))
+    book.load()
+    print(f"written {write_mapped(args.target, iter(book), book.record_id)} records")
+    book.close()
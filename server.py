@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+from concurrent_book import ConcurrentAddressBook
+from storage import JournalStorage
+
+# Мережевий доступ до AddressBook: TCP, один JSON-об'єкт на рядок.
+#   запит:   {"id": 1, "op": "find", "term": "050"}
+#   відповідь: {"id": 1, "ok": true, "result": [...]} або {"id": 1, "ok": false, "error": "..."}
+# Операції: add, find, get, list, birthday, delete, save.
+#   list: {"op": "list", "limit": 100, "order": "id"} -> {"records": [...], "cursor": ...};
+#   наступна сторінка - той самий запит із "cursor" з попередньої відповіді.
+# Клієнт може надсилати запити конвеєром, не чекаючи відповідей, - вони приходять
+# у тому ж порядку. Книга - ConcurrentAddressBook: операції виконуються в пулі потоків,
+# читання - паралельно під її блокуванням читання, тож повільний пошук не зупиняє
+# цикл подій. Зміни й збереження додатково серіалізуються через write_lock, а dump
+# пише файл, поки читачі працюють.
+
+
+def record_dict(record):
+    return {"name": record.name.value,
+            "phones": [phone.value for phone in record.phones],
+            "birthday": record.birthday.value if record.birthday else None}
+
+
+class AddressBookServer:
+    def __init__(self, book):
+        self.book = book
+        self.write_lock = asyncio.Lock()
+        self.readers = {"find": self.op_find, "get": self.op_get, "list": self.op_list, "birthday": self.op_birthday}
+        self.writers = {"add": self.op_add, "delete": self.op_delete}
+
+    def read(self, op, request):
+        # відповідь збирається під блокуванням читання, щоб record.phones не змінився посеред обходу
+        with self.book._reading():
+            return op(request)
+
+    async def handle(self, request):
+        op = request.get("op")
+        loop = asyncio.get_running_loop()
+        if op in self.readers:
+            return await loop.run_in_executor(None, self.read, self.readers[op], request)
+        if op in self.writers:
+            async with self.write_lock:
+                return await loop.run_in_executor(None, self.writers[op], request)
+        if op == "save":
+            async with self.write_lock:
+                await loop.run_in_executor(None, self.book.dump)
+            return True
+        raise ValueError(f"Unknown op: {op}")
+
+    # --- операції ---
+
+    def op_find(self, request):
+        return [record_dict(record) for record in self.book.search(str(request["term"]), request.get("limit"))]
+
+    def op_get(self, request):
+        record = self.book.find(request["name"])
+        return record_dict(record) if record else None
+
+    def op_list(self, request):
+        # сторінки за курсором, а не за зсувом: додавання й видалення між запитами
+        # не зсувають наступну сторінку, а її пошук не проходить усі попередні записи
+        records, cursor = self.book.page(request.get("cursor"), int(request.get("limit", 100)),
+                                         request.get("order", "id"))
+        return {"records": [record_dict(record) for record in records], "cursor": cursor}
+
+    def op_birthday(self, request):
+        if "days" in request:
+            return [record_dict(record) for record in self.book.upcoming_birthdays(int(request["days"]))]
+        record = self.book.find(request["name"])
+        if record is None:
+            raise ValueError(f"contact {request['name']} not found")
+        return record.days_to_birthday()
+
+    def op_add(self, request):
+        record = self.book.record_class(request["name"])
+        for phone in request.get("phones", []):
+            record.add_phone(phone)
+        if request.get("birthday"):
+            record.add_birthday(request["birthday"])
+        self.book.add_record(record)
+        return record_dict(record)
+
+    def op_delete(self, request):
+        existed = request["name"] in self.book
+        self.book.delete(request["name"])
+        return existed
+
+    # --- з'єднання ---
+
+    async def serve_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    response = {"id": request_id, "ok": True, "result": await self.handle(request)}
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    response = {"id": request_id, "ok": False, "error": str(e)}
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                # drain чекає лише коли буфер відправлення переповнений
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.serve_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the address book over TCP (JSON lines)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--book", default="adress_book.pkl")
+    args = parser.parse_args()
+
+    book = ConcurrentAddressBook(storage=JournalStorage(args.book))
+    book.load()
+    try:
+        asyncio.run(AddressBookServer(book).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        book.dump()
+        book.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import zlib
+from itertools import chain
+from pathlib import Path
+from typing import List
+
+from exporter import record_row
+from main import AddressBook, Birthday, Phone, Record, record_rank
+from storage import JournalStorage
+
+# Книга, розбита на N шардів за хешем імені. Кожен шард - окремий процес зі
+# своїм AddressBook і файлом shard-<i>.pkl. Запити до всіх шардів надсилаються
+# одночасно і виконуються паралельно, результати зливаються в головному процесі.
+# Між процесами записи передаються кортежами record_row - їх (де)серіалізація
+# на порядок дешевша за pickle об'єктів Record.
+# Записи, які повертають запити, - копії: щоб змінити контакт, додайте його знову.
+
+
+def shard_find(book, term):
+    record = book.find(term)
+    return record_row(record) if record else None
+
+
+def shard_find_by_phones(book, phones):
+    return [record_row(record) if record else None for record in book.find_by_phones(phones)]
+
+
+def shard_find_by_term(book, term):
+    return [record_row(record) for record in book.find_by_term(term)]
+
+
+def shard_search(book, term, limit):
+    lowered = term.lower()
+    return [(record_rank(record, term, lowered), record.name.value, record_row(record))
+            for record in book.search(term, limit)]
+
+
+def shard_upcoming(book, days):
+    return [(record.days_to_birthday(), record.name.value, record_row(record))
+            for record in book.upcoming_birthdays(days)]
+
+
+def shard_page(book, cursor, count):
+    records, cursor = book.page(cursor, count)
+    return [record_row(record) for record in records], cursor
+
+
+SHARD_OPS = {
+    "load": AddressBook.load,
+    "dump": AddressBook.dump,
+    "len": AddressBook.__len__,
+    "find": shard_find,
+    "delete": AddressBook.delete,
+    "add_records": AddressBook.add_records,
+    "find_by_phones": shard_find_by_phones,
+    "find_by_term": shard_find_by_term,
+    "search": shard_search,
+    "upcoming_birthdays": shard_upcoming,
+    "page": shard_page,
+}
+
+
+def shard_worker(conn, file):
+    book = AddressBook(storage=JournalStorage(file))
+    while True:
+        op, args = conn.recv()
+        if op == "close":
+            book.dump()
+            book.close()
+            conn.send((True, None))
+            return
+        try:
+            conn.send((True, SHARD_OPS[op](book, *args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class ShardedAddressBook:
+    record_class = Record
+
+    def __init__(self, directory="adress_book_shards", shards=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.shards = shards or os.cpu_count() or 1
+        self._conns = []
+        self._workers = []
+        for i in range(self.shards):
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=shard_worker, args=(child, self.directory / f"shard-{i}.pkl"),
+                                             name=f"address-book-shard-{i}", daemon=True)
+            worker.start()
+            self._conns.append(parent)
+            self._workers.append(worker)
+
+    def shard_of(self, name):
+        # hash() рандомізований між процесами, тому crc32
+        return zlib.crc32(name.encode()) % self.shards
+
+    def _call(self, shard, op, *args):
+        return self._gather({shard: (op, args)})[shard]
+
+    def _fan_out(self, op, *args):
+        results = self._gather({shard: (op, args) for shard in range(self.shards)})
+        return [results[shard] for shard in range(self.shards)]
+
+    def _gather(self, requests):
+        for shard, request in requests.items():
+            self._conns[shard].send(request)
+        results, error = {}, None
+        for shard in requests:
+            ok, result = self._conns[shard].recv()
+            if ok:
+                results[shard] = result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _record(self, row):
+        name, phones, birthday = row
+        record = self.record_class(name)
+        record.birthday = Birthday(birthday) if birthday else None
+        record.phones = [Phone.trusted(phone) for phone in phones]
+        return record
+
+    # --- інтерфейс AddressBook ---
+
+    def __len__(self):
+        return sum(self._fan_out("len"))
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def __iter__(self):
+        # сторінки за курсором: кожен запит до шарду продовжує з місця, де скінчився попередній
+        for shard in range(self.shards):
+            cursor = None
+            while True:
+                page, cursor = self._call(shard, "page", cursor, 1000)
+                yield from map(self._record, page)
+                if cursor is None:
+                    break
+
+    def iterator(self, item_number):
+        page = []
+        for record in self:
+            page.append(record)
+            if len(page) >= item_number:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def add_record(self, record):
+        self.add_records([record])
+
+    def add_records(self, records):
+        batches = {}
+        for record in records:
+            batches.setdefault(self.shard_of(record.name.value), []).append(record)
+        results = self._gather({shard: ("add_records", (batch,)) for shard, batch in batches.items()})
+        return sum(results.values())
+
+    def find(self, term):
+        row = self._call(self.shard_of(term), "find", term)
+        return self._record(row) if row else None
+
+    def delete(self, name):
+        self._call(self.shard_of(name), "delete", name)
+
+    def find_by_phone(self, phone):
+        return self.find_by_phones([phone])[0]
+
+    def find_by_phones(self, phones) -> List[Record]:
+        # шарди ділять книгу за іменем, тож номер шукаємо в усіх; власник - з першого шарду
+        phones = list(phones)
+        owners = [None] * len(phones)
+        for rows in self._fan_out("find_by_phones", phones):
+            for i, row in enumerate(rows):
+                if owners[i] is None and row is not None:
+                    owners[i] = row
+        return [self._record(row) if row else None for row in owners]
+
+    def find_by_term(self, term: str) -> List[Record]:
+        return [self._record(row) for result in self._fan_out("find_by_term", term) for row in result]
+
+    def search(self, term: str, limit=None) -> List[Record]:
+        # кожен шард повертає свої найкращі limit збігів, злиття за (ранг, ім'я)
+        ranked = sorted(chain.from_iterable(self._fan_out("search", term, limit)), key=lambda item: item[:2])
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._record(row) for _, _, row in ranked]
+
+    def upcoming_birthdays(self, days) -> List[Record]:
+        found = sorted(chain.from_iterable(self._fan_out("upcoming_birthdays", days)), key=lambda item: item[:2])
+        return [self._record(row) for _, _, row in found]
+
+    def load(self):
+        self._fan_out("load")
+
+    def dump(self):
+        self._fan_out("dump")
+
+    def close(self):
+        if not self._workers:
+            return
+        self._fan_out("close")
+        for worker in self._workers:
+            worker.join()
+        self._conns, self._workers = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,384 @@
+import sqlite3
+import weakref
+from contextlib import nullcontext
+from datetime import date
+from pathlib import Path
+from typing import List
+
+from main import Phone, Record, birthday_window, normalize_phone, parse_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    name_lower TEXT NOT NULL,
+    birthday TEXT,
+    birth_date TEXT,
+    birth_month INTEGER,
+    birth_day INTEGER
+);
+CREATE INDEX IF NOT EXISTS records_name_lower ON records(name_lower);
+CREATE INDEX IF NOT EXISTS records_birthday ON records(birth_month, birth_day);
+CREATE TABLE IF NOT EXISTS phones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id INTEGER NOT NULL REFERENCES records(id) ON DELETE CASCADE,
+    phone TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones(phone);
+CREATE INDEX IF NOT EXISTS phones_record ON phones(record_id, id);
+"""
+
+# Триграмні FTS5-індекси для пошуку підрядка. Якщо SQLite зібрано без FTS5,
+# пошук працює через GLOB по основних таблицях.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5(
+    name_lower, content='records', content_rowid='id', tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS phones_fts USING fts5(
+    phone, content='phones', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+    INSERT INTO names_fts(rowid, name_lower) VALUES (new.id, new.name_lower);
+END;
+CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+    INSERT INTO names_fts(names_fts, rowid, name_lower) VALUES ('delete', old.id, old.name_lower);
+END;
+CREATE TRIGGER IF NOT EXISTS phones_ai AFTER INSERT ON phones BEGIN
+    INSERT INTO phones_fts(rowid, phone) VALUES (new.id, new.phone);
+END;
+CREATE TRIGGER IF NOT EXISTS phones_ad AFTER DELETE ON phones BEGIN
+    INSERT INTO phones_fts(phones_fts, rowid, phone) VALUES ('delete', old.id, old.phone);
+END;
+CREATE TRIGGER IF NOT EXISTS phones_au AFTER UPDATE OF phone ON phones BEGIN
+    INSERT INTO phones_fts(phones_fts, rowid, phone) VALUES ('delete', old.id, old.phone);
+    INSERT INTO phones_fts(rowid, phone) VALUES (new.id, new.phone);
+END;
+"""
+
+RANK_SQL = "CASE WHEN {col} = {term} THEN 0 WHEN substr({col}, 1, length({term})) = {term} THEN 1 ELSE 2 END"
+
+
+def glob_escape(term):
+    return "".join(f"[{ch}]" if ch in "*?[" else ch for ch in term)
+
+
+class SQLiteAddressBook:
+    # Сумісна з AddressBook книга, що зберігає записи у файлі SQLite.
+    # Зміни накопичуються у відкритій транзакції, dump() її фіксує.
+    record_class = Record
+
+    def __init__(self, file="adress_book.db", page_size=500):
+        self.file = Path(file)
+        self.page_size = page_size
+        self.conn = sqlite3.connect(self.file)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.conn.commit()
+        self._records = weakref.WeakValueDictionary()
+
+    def _migrate(self):
+        # старі файли не мають колонки birth_date: додаємо її і заповнюємо з birthday,
+        # бо рядки на кшталт 1990-1-5 не можна порівнювати як текст
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(records)")}
+        if "birth_date" not in columns:
+            self.conn.execute("ALTER TABLE records ADD COLUMN birth_date TEXT")
+            rows = self.conn.execute("SELECT id, birthday FROM records WHERE birthday IS NOT NULL").fetchall()
+            self.conn.executemany("UPDATE records SET birth_date = ? WHERE id = ?",
+                                  [(parse_date(birthday).isoformat(), record_id) for record_id, birthday in rows])
+        self.conn.execute("DROP INDEX IF EXISTS records_birthday_date")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS records_birth_date ON records(birth_date)")
+
+    # --- матеріалізація записів ---
+
+    def _materialize(self, rows):
+        ids = [row[0] for row in rows]
+        phones = {record_id: [] for record_id in ids}
+        placeholders = ",".join("?" * len(ids))
+        for record_id, phone in self.conn.execute(
+                f"SELECT record_id, phone FROM phones WHERE record_id IN ({placeholders}) ORDER BY record_id, id",
+                ids):
+            phones[record_id].append(phone)
+
+        result = {}
+        for record_id, name, birthday in rows:
+            record = self._records.get(name)
+            if record is None:
+                record = Record(name, birthday)
+                record.phones = [Phone.trusted(phone) for phone in phones[record_id]]
+                record._book = self
+                self._records[name] = record
+            result[record_id] = record
+        return result
+
+    def _records_by_ids(self, ids):
+        # зберігає порядок і повтори ids, читає записи сторінками
+        for start in range(0, len(ids), self.page_size):
+            page = ids[start:start + self.page_size]
+            unique = list(dict.fromkeys(page))
+            placeholders = ",".join("?" * len(unique))
+            rows = self.conn.execute(
+                f"SELECT id, name, birthday FROM records WHERE id IN ({placeholders})", unique).fetchall()
+            records = self._materialize(rows)
+            for record_id in page:
+                yield records[record_id]
+
+    def _iter_query(self, sql, params=()):
+        # прокручує результат запиту сторінками, не тримаючи всю вибірку в пам'яті
+        cursor = self.conn.execute(sql, params)
+        while True:
+            ids = [row[0] for row in cursor.fetchmany(self.page_size)]
+            if not ids:
+                return
+            yield from self._records_by_ids(ids)
+
+    def _record_id(self, record):
+        row = self.conn.execute("SELECT id FROM records WHERE name = ?", (record.name.value,)).fetchone()
+        return row[0] if row else None
+
+    # --- інтерфейс AddressBook ---
+
+    @property
+    def record_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()[0]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def __contains__(self, name):
+        return self.conn.execute("SELECT 1 FROM records WHERE name = ?", (name,)).fetchone() is not None
+
+    def __getitem__(self, name):
+        record = self.find(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __setitem__(self, name, record):
+        birthday, born, month, day = self._birthday_columns(record)
+        self.conn.execute(
+            "INSERT INTO records(name, name_lower, birthday, birth_date, birth_month, birth_day) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET birthday = excluded.birthday, birth_date = excluded.birth_date, "
+            "birth_month = excluded.birth_month, birth_day = excluded.birth_day",
+            (name, record.name.value.lower(), birthday, born, month, day))
+        record_id = self.conn.execute("SELECT id FROM records WHERE name = ?", (name,)).fetchone()[0]
+        self.conn.execute("DELETE FROM phones WHERE record_id = ?", (record_id,))
+        self.conn.executemany("INSERT INTO phones(record_id, phone) VALUES (?, ?)",
+                              [(record_id, phone.value) for phone in record.phones])
+        old = self._records.get(name)
+        if old is not None and old is not record and old._book is self:
+            old._book = None
+        record._book = self
+        self._records[name] = record
+
+    def __delitem__(self, name):
+        if self.conn.execute("DELETE FROM records WHERE name = ?", (name,)).rowcount == 0:
+            raise KeyError(name)
+        record = self._records.pop(name, None)
+        if record is not None and record._book is self:
+            record._book = None
+
+    def __iter__(self):
+        return self._iter_query("SELECT id FROM records ORDER BY id")
+
+    def keys(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM records ORDER BY id")]
+
+    def values(self):
+        return iter(self)
+
+    def items(self):
+        return ((record.name.value, record) for record in self)
+
+    def add_record(self, record):
+        self[record.name.value] = record
+
+    def add_records(self, records):
+        count = 0
+        for record in records:
+            self[record.name.value] = record
+            count += 1
+        return count
+
+    def find(self, term):
+        row = self.conn.execute("SELECT id, name, birthday FROM records WHERE name = ?", (term,)).fetchone()
+        if row is None:
+            return None
+        return self._materialize([row])[row[0]]
+
+    def find_by_phone(self, phone):
+        phone = normalize_phone(phone)
+        if phone is None:
+            return None
+        row = self.conn.execute(
+            "SELECT r.id, r.name, r.birthday FROM phones p JOIN records r ON r.id = p.record_id "
+            "WHERE p.phone = ? ORDER BY p.id LIMIT 1", (phone,)).fetchone()
+        if row is None:
+            return None
+        return self._materialize([row])[row[0]]
+
+    def find_by_phones(self, phones) -> List[Record]:
+        return [self.find_by_phone(phone) for phone in phones]
+
+    def delete(self, name):
+        if name in self:
+            del self[name]
+
+    def iterator(self, item_number):
+        last_id = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, name, birthday FROM records WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, item_number)).fetchall()
+            if not rows:
+                return
+            records = self._materialize(rows)
+            yield [records[row[0]] for row in rows]
+            last_id = rows[-1][0]
+
+    def page(self, cursor=None, limit=50, order="id"):
+        # курсор - id рядка (order="id") або ім'я (order="name"); обидва стовпці проіндексовані
+        if limit <= 0:
+            raise ValueError("Page limit must be positive.")
+        if order not in ("id", "name"):
+            raise ValueError(f"Unknown page order: {order}")
+        where = f"WHERE {order} > ?" if cursor is not None else ""
+        params = (cursor, limit + 1) if cursor is not None else (limit + 1,)
+        rows = self.conn.execute(
+            f"SELECT id, name, birthday FROM records {where} ORDER BY {order} LIMIT ?", params).fetchall()
+        records = self._materialize(rows[:limit])
+        next_cursor = rows[limit - 1][0 if order == "id" else 1] if len(rows) > limit else None
+        return [records[row[0]] for row in rows[:limit]], next_cursor
+
+    def dump(self):
+        self.conn.commit()
+
+    def load(self):
+        pass
+
+    def close(self):
+        self.conn.close()
+
+    # --- пошук ---
+
+    def _phone_match(self):
+        if self.fts:
+            return "p.id IN (SELECT rowid FROM phones_fts WHERE phone GLOB :phone_pattern)"
+        return "p.phone GLOB :phone_pattern"
+
+    def _name_match(self):
+        if self.fts:
+            return "r.id IN (SELECT rowid FROM names_fts WHERE name_lower GLOB :name_pattern)"
+        return "r.name_lower GLOB :name_pattern"
+
+    @staticmethod
+    def _term_params(term):
+        lowered = term.lower()
+        return {"term": term, "lowered": lowered,
+                "phone_pattern": f"*{glob_escape(term)}*", "name_pattern": f"*{glob_escape(lowered)}*"}
+
+    def iter_by_term(self, term):
+        params = self._term_params(term)
+        yield from self._iter_query(
+            f"SELECT p.record_id FROM phones p WHERE {self._phone_match()} ORDER BY p.record_id, p.id", params)
+        yield from self._iter_query(
+            f"SELECT r.id FROM records r WHERE {self._name_match()} ORDER BY r.id", params)
+
+    def find_by_term(self, term: str) -> List[Record]:
+        return list(self.iter_by_term(term))
+
+    def search(self, term: str, limit=None) -> List[Record]:
+        if limit is not None and limit <= 0:
+            return []
+        params = self._term_params(term)
+        params["limit"] = -1 if limit is None else limit
+        sql = (
+            "SELECT id, MIN(rank) AS best FROM ("
+            f"SELECT r.id AS id, {RANK_SQL.format(col='r.name_lower', term=':lowered')} AS rank "
+            f"FROM records r WHERE {self._name_match()} "
+            "UNION ALL "
+            f"SELECT p.record_id AS id, {RANK_SQL.format(col='p.phone', term=':term')} AS rank "
+            f"FROM phones p WHERE {self._phone_match()}"
+            ") GROUP BY id ORDER BY best, id LIMIT :limit"
+        )
+        return list(self._iter_query(sql, params))
+
+    @staticmethod
+    def _birthday_columns(record):
+        if record.birthday is None:
+            return None, None, None, None
+        born = record.birthday.date
+        return record.birthday.value, born.isoformat(), born.month, born.day
+
+    def range_by_name(self, low=None, high=None, inclusive=(True, True)) -> List[Record]:
+        conditions, params = [], []
+        if low is not None:
+            conditions.append("name >= ?" if inclusive[0] else "name > ?")
+            params.append(low)
+        if high is not None:
+            conditions.append("name <= ?" if inclusive[1] else "name < ?")
+            params.append(high)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return list(self._iter_query(f"SELECT id FROM records {where} ORDER BY name", params))
+
+    def range_by_birthday(self, start=None, end=None) -> List[Record]:
+        # birth_date завжди у форматі YYYY-MM-DD, тож порядок рядків збігається з порядком дат
+        conditions, params = ["birth_date IS NOT NULL"], []
+        if start is not None:
+            conditions.append("birth_date >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("birth_date <= ?")
+            params.append(end.isoformat())
+        return list(self._iter_query(
+            f"SELECT id FROM records WHERE {' AND '.join(conditions)} ORDER BY birth_date, name", params))
+
+    def upcoming_birthdays(self, days) -> List[Record]:
+        month_days = birthday_window(date.today(), days)
+        pairs = list(month_days)
+        result = []
+        step = max(1, self.page_size // 2)
+        for start in range(0, len(pairs), step):
+            chunk = pairs[start:start + step]
+            where = " OR ".join("(birth_month = ? AND birth_day = ?)" for _ in chunk)
+            params = [value for pair in chunk for value in pair]
+            rows = self.conn.execute(f"SELECT id, name, birthday, birth_month, birth_day FROM records "
+                                     f"WHERE {where}", params).fetchall()
+            records = self._materialize([row[:3] for row in rows])
+            result.extend((month_days[row[3], row[4]], row[0], records[row[0]]) for row in rows)
+        result.sort(key=lambda item: item[:2])
+        return [record for _, _, record in result]
+
+    # --- сповіщення від Record ---
+
+    def _writing(self):
+        return nullcontext()
+
+    def _birthday_changed(self, record):
+        birthday, born, month, day = self._birthday_columns(record)
+        self.conn.execute("UPDATE records SET birthday = ?, birth_date = ?, birth_month = ?, birth_day = ? "
+                          "WHERE name = ?", (birthday, born, month, day, record.name.value))
+
+    def _phone_added(self, record, phone):
+        self.conn.execute("INSERT INTO phones(record_id, phone) VALUES (?, ?)", (self._record_id(record), phone))
+
+    def _phone_removed(self, record, phone):
+        self.conn.execute(
+            "DELETE FROM phones WHERE id = (SELECT id FROM phones WHERE record_id = ? AND phone = ? "
+            "ORDER BY id LIMIT 1)", (self._record_id(record), phone))
+
+    def _phone_edited(self, record, old_phone, new_phone):
+        self.conn.execute(
+            "UPDATE phones SET phone = ? WHERE id = (SELECT id FROM phones WHERE record_id = ? AND phone = ? "
+            "ORDER BY id LIMIT 1)", (new_phone, self._record_id(record), old_phone))
+
+    def _phones_replaced(self, record, old_phones, new_phones):
+        record_id = self._record_id(record)
+        self.conn.execute("DELETE FROM phones WHERE record_id = ?", (record_id,))
+        self.conn.executemany("INSERT INTO phones(record_id, phone) VALUES (?, ?)",
+                              [(record_id, phone) for phone in new_phones])
@@ -0,0 +1,278 @@
+import os
+import pickle
+import threading
+from pathlib import Path
+
+
+class PickleStorage:
+    # last_bytes - скільки байтів прочитав останній load або записав останній save
+    def __init__(self, file):
+        self.file = Path(file)
+        self.last_bytes = 0
+
+    def load(self):
+        loaded, self.last_bytes = self._read()
+        return loaded
+
+    def _read(self):
+        if not self.file.exists():
+            return None, 0
+        with open(self.file, "rb") as file:
+            return pickle.load(file), file.tell()
+
+    def save(self, book, changed):
+        # пишемо у тимчасовий файл і атомарно підміняємо - збій посеред запису не псує книгу
+        tmp = self.file.with_name(self.file.name + ".tmp")
+        with open(tmp, "wb") as file:
+            pickle.dump((book.record_id, dict(book.data)), file)
+            file.flush()
+            os.fsync(file.fileno())
+            self.last_bytes = file.tell()
+        os.replace(tmp, self.file)
+
+    def close(self):
+        pass
+
+
+class ChunkedPickleStorage(PickleStorage):
+    # Заголовок (MAGIC, record_id), далі пакети по chunk_size записів. Запис іде сторінками
+    # з book.iterator, читання - потоком пар (ключ, запис), тож пам'ять не подвоюється.
+    MAGIC = "address-book/chunked-pickle/1"
+
+    def __init__(self, file, chunk_size=1000):
+        super().__init__(file)
+        self.chunk_size = chunk_size
+
+    def load(self):
+        if not self.file.exists():
+            self.last_bytes = 0
+            return None
+        self.last_bytes = self.file.stat().st_size
+        with open(self.file, "rb") as file:
+            header = pickle.load(file)
+        if not (isinstance(header, tuple) and header and header[0] == self.MAGIC):
+            # файл, записаний PickleStorage
+            return header
+        return header[1], self._records()
+
+    def _records(self):
+        with open(self.file, "rb") as file:
+            pickle.load(file)
+            while True:
+                try:
+                    chunk = pickle.load(file)
+                except EOFError:
+                    return
+                for record in chunk:
+                    yield record.name.value, record
+
+    def save(self, book, changed):
+        tmp = self.file.with_name(self.file.name + ".tmp")
+        with open(tmp, "wb") as file:
+            pickle.dump((self.MAGIC, book.record_id), file)
+            for page in book.iterator(self.chunk_size):
+                pickle.dump(page, file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.last_bytes = file.tell()
+        os.replace(tmp, self.file)
+
+
+class JournalStorage(ChunkedPickleStorage):
+    # Знімок у форматі ChunkedPickleStorage (або старому PickleStorage) + журнал змін, що тільки
+    # дописується. Кожен save дописує один пакет (record_id, [(key, record або None), ...]),
+    # тож вартість збереження пропорційна кількості змін, а не розміру книги.
+    # load і стискання журналу читають знімок потоком і накладають на нього зміни з журналу,
+    # тож у пам'яті одночасно лише зміни і один пакет знімка, а не друга копія книги.
+    def __init__(self, file, compact_ratio=0.5, min_compact_bytes=1 << 20, fsync=False, chunk_size=1000):
+        super().__init__(file, chunk_size)
+        self.journal = self.file.with_name(self.file.name + ".journal")
+        self.sealed = self.file.with_name(self.file.name + ".journal.old")
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    @staticmethod
+    def _size(path):
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _replay(path, record_id, changes, truncate=False):
+        # читає пакети журналу в changes = (updated, tail): updated - записи, змінені на місці,
+        # tail - ключі, що видалялися, у порядку, в якому вони опиняються в кінці книги
+        # (None - ключ зараз видалений). encode пише (key, None) перед кожним новим записом,
+        # тож запис без попереднього видалення вже є в книзі і лишається на своєму місці
+        if not path.exists():
+            return record_id
+        updated, tail = changes
+        with open(path, "r+b" if truncate else "rb") as file:
+            while True:
+                offset = file.tell()
+                try:
+                    batch_id, batch = pickle.load(file)
+                except (EOFError, pickle.UnpicklingError):
+                    # обірваний пакет після збою - відкидаємо хвіст журналу
+                    if truncate:
+                        file.truncate(offset)
+                    break
+                for key, record in batch:
+                    if record is None:
+                        updated.pop(key, None)
+                        tail.pop(key, None)
+                        tail[key] = None
+                    elif key not in tail:
+                        updated[key] = record
+                    elif tail[key] is None:
+                        del tail[key]
+                        tail[key] = record
+                    else:
+                        tail[key] = record
+                record_id = max(record_id, batch_id)
+        return record_id
+
+    def _open_snapshot(self):
+        # (record_id, файл, пари зі старого знімка PickleStorage) або None; файл читається далі
+        # пакетами в _merged
+        if not self.file.exists():
+            return None
+        file = open(self.file, "rb")
+        header = pickle.load(file)
+        if isinstance(header, tuple) and header and header[0] == self.MAGIC:
+            return header[1], file, None
+        file.close()
+        record_id, data = header
+        return record_id, None, data.items()
+
+    def _merged(self, snapshot, changes):
+        # пари (ключ, запис) знімка з накладеними змінами, у порядку книги
+        updated, tail = changes
+        updated = dict(updated)
+        if snapshot is not None:
+            _, file, items = snapshot
+            if file is not None:
+                items = self._chunked_items(file)
+            for key, record in items:
+                if key in tail:
+                    continue
+                yield key, updated.pop(key, record)
+        # записи старих журналів, додані без попереднього видалення
+        yield from updated.items()
+        for key, record in tail.items():
+            if record is not None:
+                yield key, record
+
+    @staticmethod
+    def _chunked_items(file):
+        with file:
+            while True:
+                try:
+                    chunk = pickle.load(file)
+                except EOFError:
+                    return
+                for record in chunk:
+                    yield record.name.value, record
+
+    def load(self):
+        # під _lock: write з іншого потоку (AutoSaver) не дописує пакет у журнал, який
+        # ми саме обрізаємо; незавершене стискання спершу доводимо до кінця. Записи
+        # віддаються потоком, стискання недописаного журналу стартує, коли потік вичерпано
+        with self._lock:
+            if self._compactor is not None:
+                self._compactor.join()
+            snapshot = self._open_snapshot()
+            record_id = snapshot[0] if snapshot is not None else 0
+            changes = ({}, {})
+            record_id = self._replay(self.sealed, record_id, changes)
+            record_id = self._replay(self.journal, record_id, changes, truncate=True)
+            self.last_bytes = self._size(self.file) + self._size(self.sealed) + self._size(self.journal)
+            if snapshot is None and not self.sealed.exists() and not self.journal.exists():
+                return None
+            sealed = self.sealed.exists()
+        return record_id, self._loaded(snapshot, changes, sealed)
+
+    def _loaded(self, snapshot, changes, sealed):
+        yield from self._merged(snapshot, changes)
+        if sealed:
+            self.compact(wait=False)
+
+    def save(self, book, changed):
+        self.write(self.encode(book, changed))
+
+    # save розбитий на дві частини, щоб серіалізувати зміни під блокуванням книги,
+    # а писати на диск уже без нього (див. AddressBook.dump)
+    def encode(self, book, changed):
+        # пакет у порядку книги: видалені й змінені записи лишаються на своїх місцях,
+        # а додані після попереднього збереження (book._saved_id) спершу видаляються і
+        # дописуються в кінець - після відновлення порядок записів той самий, що в книзі
+        if not changed:
+            return None
+        data, order, saved_id = book.data, book._order, book._saved_id
+        batch = []
+        for key in sorted(changed, key=lambda key: order.get(key, 0)):
+            record = data.get(key)
+            if record is not None and order[key] > saved_id:
+                batch.append((key, None))
+            batch.append((key, record))
+        return pickle.dumps((book.record_id, batch), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write(self, payload):
+        self.last_bytes = len(payload) if payload is not None else 0
+        if payload is None:
+            return
+        with self._lock:
+            with open(self.journal, "ab") as file:
+                file.write(payload)
+                file.flush()
+                if self.fsync:
+                    os.fsync(file.fileno())
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        threshold = max(self.min_compact_bytes, self._size(self.file) * self.compact_ratio)
+        if self._size(self.journal) >= threshold:
+            self.compact(wait=False)
+
+    def compact(self, wait=True):
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                thread = self._compactor
+            else:
+                if not self.sealed.exists():
+                    if not self.journal.exists():
+                        return
+                    os.replace(self.journal, self.sealed)
+                thread = threading.Thread(target=self._compact, name="journal-compactor")
+                self._compactor = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _compact(self):
+        # новий знімок пишеться пакетами просто з потоку старого знімка і запечатаного журналу
+        snapshot = self._open_snapshot()
+        changes = ({}, {})
+        record_id = self._replay(self.sealed, snapshot[0] if snapshot is not None else 0, changes)
+        tmp = self.file.with_name(self.file.name + ".tmp")
+        with open(tmp, "wb") as file:
+            pickle.dump((self.MAGIC, record_id), file)
+            chunk = []
+            for _, record in self._merged(snapshot, changes):
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+                    chunk = []
+            if chunk:
+                pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.file)
+        self.sealed.unlink()
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
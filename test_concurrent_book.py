@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+from concurrent_book import ConcurrentAddressBook
+from main import Record
+
+
+class TestConcurrentPhoneChanges(unittest.TestCase):
+    def setUp(self):
+        self.book = ConcurrentAddressBook(file="unused.pkl")
+        self.record = Record("Callcenter")
+        for i in range(3000):
+            self.record.add_phone(f"{i:010d}")
+        self.book.add_record(self.record)
+        self.errors = []
+
+    def run_threads(self, targets, seconds=1.0):
+        stop = threading.Event()
+
+        def guarded(target):
+            try:
+                while not stop.is_set():
+                    target()
+            except Exception as e:
+                self.errors.append(e)
+                stop.set()
+
+        threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        stop.wait(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    def test_readers_never_see_phones_mid_change(self):
+        counter = iter(range(10 ** 9))
+
+        def change_phones():
+            number = f"{5000 + next(counter) % 100:010d}"
+            if self.record.find_phone(number) is None:
+                self.record.add_phone(number)
+            else:
+                self.record.remove_phone(number)
+
+        def read():
+            self.book.find_by_term("00000")
+            self.book.search("0000005", 10)
+
+        self.run_threads([change_phones, read, read])
+        self.assertEqual(self.errors, [])
+        indexed = {phone.value for phone in self.record.phones}
+        self.assertEqual(set(self.book.complete_phones("")), indexed)
+
+    def test_change_after_delete_is_not_indexed(self):
+        def delete_and_add():
+            self.book.delete("Callcenter")
+            self.book.add_record(Record("Callcenter"))
+
+        def edit():
+            self.record.edit_phone("0000000001", "9999999999")
+            self.record.edit_phone("9999999999", "0000000001")
+
+        self.run_threads([delete_and_add, edit])
+        self.assertEqual(self.errors, [])
+        self.assertIsNone(self.book.find_by_phone("0000000001"))
+        self.assertIsNone(self.book.find_by_phone("9999999999"))
+        self.assertEqual(self.book.complete_phones(""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
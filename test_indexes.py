@@ -0,0 +1,251 @@
+import random
+import unittest
+from datetime import date
+
+from main import AddressBook, Birthday, BKTree, CompactRecord, InsertionLog, Record, SortedIndex, distance_from, rank_records
+
+
+def random_records(rng, count):
+    records = []
+    for i in range(count):
+        record = Record(f"{rng.choice(['Ann', 'Bob', 'Con', 'Dan'])}{rng.randrange(50)}x{i}")
+        for _ in range(rng.randrange(3)):
+            number = f"{rng.choice(['050', '067', '093'])}{rng.randrange(10 ** 7):07d}"
+            if record.find_phone(number) is None:
+                record.add_phone(number)
+        if rng.random() < 0.5:
+            record.add_birthday(f"{rng.randrange(1950, 2005)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}")
+        records.append(record)
+    return records
+
+
+def dp_levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, y in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (x != y))
+    return row[-1]
+
+
+def random_word(rng, alphabet, longest):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randrange(longest + 1)))
+
+
+def scan_find_by_term(book, term):
+    # find_by_term до індексів: перебір усієї книги
+    matching_records = []
+    for record in book.data.values():
+        for phone in record.phones:
+            if term in phone.value:
+                matching_records.append(record)
+    matching_records.extend(record for record in book.data.values() if term.lower() in record.name.value.lower())
+    return matching_records
+
+
+def query_results(book):
+    names = lambda records: [record.name.value for record in records]
+    terms = ["an", "Con1", "050", "0671", "x1", "zz", "b"]
+    return {
+        "search": [names(book.search(term, limit)) for term in terms for limit in (None, 5)],
+        "find_by_term": [names(book.find_by_term(term)) for term in terms],
+        "fuzzy": [names(book.fuzzy_search(term)) for term in ["ann1x3", "bob"]],
+        "phones": sorted(book.complete_phones("")),
+        "owners": {number: book.find_by_phone(number).name.value for number in book.complete_phones("")},
+        "complete": book.complete_names("co"),
+        "by_name": names(book.range_by_name("B", "D")),
+        "by_birthday": names(book.range_by_birthday(date(1960, 1, 1), date(1990, 12, 31))),
+        "upcoming": names(book.upcoming_birthdays(60)),
+        "pages": names(book.page(limit=10 ** 6, order="name")[0]),
+    }
+
+
+class TestDeferredIndexes(unittest.TestCase):
+    def test_deferred_indexes_match_eager_ones(self):
+        eager = AddressBook(file="unused.pkl")
+        deferred = AddressBook(file="unused.pkl")
+        deferred.defer_indexes()
+        for book in (eager, deferred):
+            book.add_records(random_records(random.Random(7), 600))
+        self.assertTrue(deferred._indexes_stale)
+
+        # зміни, поки індекси відкладені, мусять потрапити в перебудову
+        for book in (eager, deferred):
+            script = random.Random(11)
+            for _ in range(100):
+                key = script.choice(list(book.data))
+                action = script.randrange(4)
+                if action == 0:
+                    book.delete(key)
+                elif action == 1:
+                    book[key].add_birthday("1975-05-05")
+                elif action == 2 and book[key].phones:
+                    book[key].edit_phone(book[key].phones[0].value, f"099{script.randrange(10 ** 7):07d}")
+                else:
+                    book.add_record(Record(f"New{script.randrange(10 ** 6)}"))
+        self.assertEqual(query_results(deferred), query_results(eager))
+        self.assertFalse(deferred._indexes_stale)
+
+    def test_first_query_builds_indexes(self):
+        book = AddressBook(file="unused.pkl")
+        book.defer_indexes()
+        record = Record("Ann")
+        record.add_phone("0501234567")
+        record.birthday = Birthday("1990-01-05")
+        book.add_record(record)
+        self.assertTrue(book._indexes_stale)
+        self.assertIs(book.find_by_phone("0501234567"), record)
+        self.assertEqual(book.range_by_birthday(date(1990, 1, 1), date(1990, 1, 31)), [record])
+
+
+class TestDistance(unittest.TestCase):
+    def test_matches_dynamic_programming(self):
+        rng = random.Random(3)
+        for _ in range(2000):
+            # довгі слова перевіряють перенесення між бітами, короткий алфавіт - збіги
+            a = random_word(rng, "abcд", rng.choice((3, 12, 70)))
+            b = random_word(rng, "abcд", rng.choice((3, 12, 70)))
+            self.assertEqual(distance_from(a)(b), dp_levenshtein(a, b), (a, b))
+
+
+class TestBKTree(unittest.TestCase):
+    def test_search_matches_brute_force(self):
+        rng = random.Random(5)
+        tree = BKTree()
+        tree.FLUSH_LIMIT = 40
+        words = {}
+        for step in range(3000):
+            key = f"k{rng.randrange(400)}"
+            if key in words and rng.random() < 0.4:
+                tree.remove(key, words.pop(key))
+            elif key not in words:
+                words[key] = random_word(rng, "abcde", 7)
+                tree.add(key, words[key])
+            if step % 50 == 0:
+                term, k = random_word(rng, "abcde", 7), rng.randrange(4)
+                expected = sorted((dp_levenshtein(term, word), key) for key, word in words.items()
+                                  if dp_levenshtein(term, word) <= k)
+                self.assertEqual(sorted(tree.search(term, k)), expected)
+                # без перебору черги знаходиться лише те, що вже в дереві
+                self.assertLessEqual(set(tree.search(term, k, pending=False)), set(expected))
+        tree.FLUSH_LIMIT = None
+        term = random_word(rng, "abcde", 7)
+        expected = sorted((dp_levenshtein(term, word), key) for key, word in words.items() if dp_levenshtein(term, word) <= 2)
+        self.assertEqual(sorted(tree.search(term, 2, pending=False)), expected)
+
+
+class TestSortedIndex(unittest.TestCase):
+    def check(self, index, values, key):
+        flat = list(index.irange())
+        self.assertEqual(len(index), len(values))
+        self.assertEqual(sorted(flat), sorted(values))
+        self.assertEqual([key(value) for value in flat], sorted(key(value) for value in values))
+
+    def test_random_operations_match_a_sorted_list(self):
+        rng = random.Random(9)
+        for key in (None, str.lower):
+            index = SortedIndex(key=key)
+            # малі блоки, щоб розбиття і видалення порожніх блоків траплялися часто
+            index.LOAD = 3
+            key = key or (lambda value: value)
+            values = []
+            for _ in range(1500):
+                action = rng.random()
+                if values and action < 0.45:
+                    value = rng.choice(values)
+                    values.remove(value)
+                    index.remove(value)
+                elif action < 0.5:
+                    batch = [random_word(rng, "abAB", 4) for _ in range(rng.randrange(1, 10))]
+                    values.extend(batch)
+                    index.update(batch)
+                else:
+                    value = random_word(rng, "abAB", 4)
+                    values.append(value)
+                    index.add(value)
+                index.remove("missing")
+                self.check(index, values, key)
+
+                low, high = sorted(key(random_word(rng, "abAB", 3)) for _ in range(2))
+                inclusive = (rng.random() < 0.5, rng.random() < 0.5)
+                expected = [value for value in values
+                            if (low < key(value) or inclusive[0] and low == key(value))
+                            and (key(value) < high or inclusive[1] and key(value) == high)]
+                self.assertEqual(sorted(index.irange(low, high, inclusive)), sorted(expected))
+                prefix = key(random_word(rng, "abAB", 2))
+                self.assertEqual(sorted(index.prefixed(prefix)),
+                                 sorted(value for value in values if key(value).startswith(prefix)))
+                self.assertEqual(len(index.prefixed(prefix, 2)), min(2, len(index.prefixed(prefix))))
+
+
+class TestInsertionLog(unittest.TestCase):
+    def test_pages_follow_insertion_order_after_compaction(self):
+        rng = random.Random(13)
+        book = AddressBook(file="unused.pkl")
+        book.add_records([Record(f"Name{i}") for i in range(4000)])
+        for _ in range(3):
+            # видалень більше, ніж живих записів, - журнал стискається
+            deleted = rng.sample(list(book.data), len(book.data) * 2 // 3)
+            for key in deleted:
+                book.delete(key)
+            # повторно додане ім'я має з'явитися лише на новому місці
+            book.add_records([Record(key) for key in rng.sample(deleted, 200)])
+
+            pages, cursor = [], None
+            while True:
+                records, cursor = book.page(cursor, limit=97)
+                pages.extend(record.name.value for record in records)
+                if cursor is None:
+                    break
+            self.assertEqual(pages, list(book.data))
+
+    def test_after_skips_discarded_keys(self):
+        order = {}
+        log = InsertionLog(order)
+        for seq in range(1, 3001):
+            order[f"k{seq}"] = seq
+            log.append(seq, f"k{seq}")
+        for seq in range(1, 3001, 3):
+            del order[f"k{seq}"]
+            log.discard()
+        self.assertEqual(log.after(0, 10 ** 6), [(seq, key) for key, seq in order.items()])
+        self.assertEqual(log.after(1500, 4), [(seq, key) for key, seq in order.items() if seq > 1500][:4])
+
+
+class TestSearchEquivalence(unittest.TestCase):
+    def test_indexed_search_matches_a_scan(self):
+        rng = random.Random(17)
+        for _ in range(20):
+            book = AddressBook(file="unused.pkl")
+            for _ in range(rng.randrange(1, 300)):
+                record = (CompactRecord if rng.random() < 0.3 else Record)(random_word(rng, "abcAB", 8) or "a")
+                for _ in range(rng.randrange(3)):
+                    number = "".join(rng.choice("0123") for _ in range(10))
+                    if record.find_phone(number) is None:
+                        record.add_phone(number)
+                book.add_record(record)
+            for _ in range(40):
+                action = rng.random()
+                if book.data and action < 0.3:
+                    book.delete(rng.choice(list(book.data)))
+                elif book.data and action < 0.5:
+                    record = book[rng.choice(list(book.data))]
+                    if record.phones:
+                        number = "".join(rng.choice("0123") for _ in range(10))
+                        if record.find_phone(number) is None:
+                            record.edit_phone(record.phones[0].value, number)
+                else:
+                    book.add_record(Record(random_word(rng, "abcAB", 8) or "b"))
+
+            for _ in range(30):
+                term = rng.choice(["", "a", "ab", "aB", "Abc", "abca", "x", "0", "01",
+                                   "".join(rng.choice("0123") for _ in range(rng.randrange(1, 11))),
+                                   random_word(rng, "abcAB", 5)])
+                self.assertEqual(book.find_by_term(term), scan_find_by_term(book, term), term)
+                self.assertEqual(book.search(term), rank_records(book.data.values(), term), term)
+                for limit in (1, 3, 10, 1000):
+                    self.assertEqual(book.search(term, limit), rank_records(book.data.values(), term, limit), (term, limit))
+
+
+if __name__ == "__main__":
+    unittest.main()
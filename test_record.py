@@ -0,0 +1,102 @@
+import unittest
+from datetime import date
+
+from main import AddressBook, Birthday, Phone, Record, normalize_phone
+
+
+class TestPhoneListInBook(unittest.TestCase):
+    def setUp(self):
+        self.book = AddressBook(file="unused.pkl")
+        self.record = Record("Ann")
+        self.record.add_phone("0501234567")
+        self.book.add_record(self.record)
+
+    def assertIndexed(self, numbers):
+        self.assertEqual([phone.value for phone in self.record.phones], numbers)
+        self.assertEqual(self.book.complete_phones(""), sorted(numbers))
+        for number in numbers:
+            self.assertEqual(self.record.find_phone(number).value, number)
+            self.assertIs(self.book.find_by_phone(number), self.record)
+
+    def test_phone_value_changed_in_place(self):
+        self.record.find_phone("0501234567").value = "0671112233"
+        self.assertIsNone(self.record.find_phone("0501234567"))
+        self.assertIsNone(self.book.find_by_phone("0501234567"))
+        self.assertIndexed(["0671112233"])
+
+        self.record.add_phone("0501234567")
+        self.assertIndexed(["0671112233", "0501234567"])
+        with self.assertRaises(ValueError):
+            self.record.find_phone("0671112233").value = "0501234567"
+        with self.assertRaises(ValueError):
+            self.record.find_phone("0671112233").value = "12"
+        self.assertIndexed(["0671112233", "0501234567"])
+
+    def test_append_and_pop_update_the_book(self):
+        self.record.phones.append(Phone("0679998877"))
+        self.assertIndexed(["0501234567", "0679998877"])
+        self.assertEqual(self.book.find_by_term("0679998"), [self.record])
+        with self.assertRaises(ValueError):
+            self.record.phones.append(Phone("0679998877"))
+
+        removed = self.record.phones.pop("0501234567")
+        self.assertEqual(removed.value, "0501234567")
+        self.assertIndexed(["0679998877"])
+        self.assertIsNone(self.book.find_by_phone("0501234567"))
+
+        # відпущений Phone більше не пов'язаний із записом
+        removed.value = "0500000000"
+        self.assertIndexed(["0679998877"])
+
+        self.book.delete("Ann")
+        self.assertIsNone(self.book.find_by_phone("0679998877"))
+        self.assertEqual(self.book.complete_phones(""), [])
+
+    def test_replaced_list_is_detached(self):
+        old_list = self.record.phones
+        kept = old_list[0]
+        self.record.phones = [kept, "0502222222"]
+        old_list.append(Phone("0503333333"))
+        self.assertIndexed(["0501234567", "0502222222"])
+
+        kept.value = "0504444444"
+        self.assertIndexed(["0504444444", "0502222222"])
+
+        # той самий Phone у двох записах копіюється, а не ділиться
+        other = Record("Bob")
+        other.phones = self.record.phones
+        other.phones[0].value = "0505555555"
+        self.assertIndexed(["0504444444", "0502222222"])
+
+
+class TestTrustedFields(unittest.TestCase):
+    def test_trusted_birthday_has_a_date(self):
+        birthday = Birthday.trusted("1990-01-05")
+        self.assertEqual(birthday.value, "1990-01-05")
+        self.assertEqual(birthday.date, date(1990, 1, 5))
+
+        record = Record("Ann")
+        record.birthday = birthday
+        self.assertGreaterEqual(record.days_to_birthday(), 0)
+        book = AddressBook(file="unused.pkl")
+        book.add_record(record)
+        self.assertEqual(book.range_by_birthday(date(1990, 1, 1), date(1990, 1, 31)), [record])
+
+
+class TestNormalizePhone(unittest.TestCase):
+    def test_accepted_formats(self):
+        for value in ["0504567890", "050 456 78 90", "050-456-78-90", "(050) 4567890", "+38 050 456 7890", "+380504567890"]:
+            self.assertEqual(normalize_phone(value), "0504567890", value)
+            self.assertEqual(Phone(value).value, "0504567890")
+
+    def test_rejected_values(self):
+        # isdigit() пропускає цифри інших систем - вони не номер
+        for value in ["050456789", "05045678901", "050456789a", "+39 050 456 7890", "", None, 504567890,
+                      "٠٥٠٤٥٦٧٨٩٠", "050456789¹", "０５０４５６７８９０"]:
+            self.assertIsNone(normalize_phone(value), value)
+            with self.assertRaises(ValueError):
+                Phone(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
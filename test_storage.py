@@ -0,0 +1,117 @@
+import pickle
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from main import AddressBook, Record
+from storage import JournalStorage
+
+
+class TestJournalRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = Path(self.directory.name) / "book.pkl"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_book(self):
+        book = AddressBook(storage=JournalStorage(self.file))
+        book.load()
+        return book
+
+    def reloaded_names(self):
+        book = self.open_book()
+        try:
+            return list(book.data)
+        finally:
+            book.close()
+
+    def test_insertion_order_survives_reload(self):
+        book = self.open_book()
+        for name in "ABCDEF":
+            record = Record(name)
+            record.add_phone(f"050000000{ord(name) % 10}")
+            book.add_record(record)
+        book.dump()
+        self.assertEqual(self.reloaded_names(), list("ABCDEF"))
+
+        # зміна лишає запис на місці, повторне додавання переносить у кінець
+        book.find("B").add_phone("0671234567")
+        book.delete("C")
+        book.add_record(Record("C"))
+        book.add_record(Record("G"))
+        book.delete("E")
+        book.dump()
+        self.assertEqual(list(book.data), list("ABDFCG"))
+        self.assertEqual(self.reloaded_names(), list(book.data))
+
+        # те саме після стискання журналу в знімок
+        book.storage.compact()
+        book.close()
+        reloaded = self.open_book()
+        self.assertEqual(list(reloaded.data), list("ABDFCG"))
+        self.assertEqual([record.name.value for record in reloaded.page(limit=10)[0]], list("ABDFCG"))
+        reloaded.close()
+
+    def test_record_added_after_reload_goes_last(self):
+        book = self.open_book()
+        for name in "ABC":
+            book.add_record(Record(name))
+        book.dump()
+        book.close()
+
+        book = self.open_book()
+        book.delete("A")
+        book.add_record(Record("A"))
+        book.dump()
+        book.close()
+        self.assertEqual(self.reloaded_names(), list("BCA"))
+
+    def test_random_edits_survive_reload_and_compaction(self):
+        rng = random.Random(3)
+        book = self.open_book()
+        for step in range(400):
+            action = rng.randrange(5)
+            name = f"N{rng.randrange(60)}"
+            if action <= 1:
+                book.add_record(Record(name))
+            elif action == 2:
+                book.delete(name)
+            elif action == 3 and name in book.data:
+                number = f"050{rng.randrange(10 ** 7):07d}"
+                if book[name].find_phone(number) is None:
+                    book[name].add_phone(number)
+            if step % 7 == 0:
+                book.dump()
+            if step % 50 == 0:
+                book.dump()
+                book.storage.compact()
+            if step % 30 == 0:
+                book.dump()
+                book.close()
+                expected = [(key, [phone.value for phone in record.phones]) for key, record in book.data.items()]
+                book = self.open_book()
+                self.assertEqual([(key, [phone.value for phone in record.phones])
+                                  for key, record in book.data.items()], expected)
+        book.close()
+
+    def test_compaction_writes_a_chunked_snapshot(self):
+        # старий знімок PickleStorage читається, а після стискання лишається знімок пакетами
+        with open(self.file, "wb") as file:
+            pickle.dump((2, {"A": Record("A"), "B": Record("B")}), file)
+        book = self.open_book()
+        book.delete("A")
+        book.add_record(Record("C"))
+        book.add_record(Record("A"))
+        book.dump()
+        book.storage.compact()
+        book.close()
+        with open(self.file, "rb") as file:
+            self.assertEqual(pickle.load(file), (JournalStorage.MAGIC, 4))
+        self.assertEqual(self.reloaded_names(), list("BCA"))
+
+
+if __name__ == "__main__":
+    unittest.main()